@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from pagination import InvalidPageRequest
+from timing import span
+
+DEFAULT_PAGE_ROWS = 10000
+MAX_PAGE_ROWS = 50000
+ITERSIZE = 2000
+
+COLUMNS = [
+    'id', 'application_type', 'name', 'surname', 'email', 'phone',
+    'position', 'experience', 'cover_letter', 'portfolio_url',
+    'university', 'course', 'specialty', 'direction', 'motivation_letter',
+    'created_at', 'updated_at',
+]
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+APPLICATION_TYPES = ('applicant', 'student')
+
+
+def parse_timestamp(params: Dict[str, Any], name: str) -> Optional[datetime]:
+    '''ISO date or datetime query parameter, a bare date means its midnight'''
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise InvalidPageRequest(f'{name} must be an ISO date or datetime')
+
+
+def export_filters(params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    '''
+    Validated filters and the scope string cursors are bound to, so a
+    continuation token cannot be replayed with different filters.
+    '''
+    export_format = params.get('format') or 'csv'
+    if export_format not in FORMATS:
+        raise InvalidPageRequest(f"format must be one of {', '.join(FORMATS)}")
+    application_type = params.get('application_type') or None
+    if application_type is not None and application_type not in APPLICATION_TYPES:
+        raise InvalidPageRequest('application_type must be applicant or student')
+    filters = {
+        'format': export_format,
+        'application_type': application_type,
+        'created_from': parse_timestamp(params, 'created_from'),
+        'created_to': parse_timestamp(params, 'created_to'),
+    }
+    scope = ':'.join(['applications', export_format, application_type or ''] + [
+        value.isoformat() if value else '' for value in (filters['created_from'], filters['created_to'])
+    ])
+    return scope, filters
+
+
+def export_query(filters: Dict[str, Any], after_id: int, limit: int) -> Tuple[str, tuple]:
+    '''
+    Keyset page ordered by id. The type and created_at conditions are plain
+    column comparisons, so the planner can answer them from
+    idx_applications_type and idx_applications_created_at.
+    '''
+    conditions = ['id > %s']
+    values: List[Any] = [after_id]
+    if filters['application_type']:
+        conditions.append('application_type = %s')
+        values.append(filters['application_type'])
+    if filters['created_from']:
+        conditions.append('created_at >= %s')
+        values.append(filters['created_from'])
+    if filters['created_to']:
+        conditions.append('created_at < %s')
+        values.append(filters['created_to'])
+    values.append(limit)
+    return f'''
+        SELECT {', '.join(COLUMNS)}
+        FROM applications
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id
+        LIMIT %s
+    ''', tuple(values)
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode_csv(rows: List[tuple], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, (date, datetime)) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+def encode_ndjson(rows: List[tuple], header: bool) -> str:
+    return ''.join(
+        json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False, default=_json_default) + '\n'
+        for row in rows
+    )
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson}
+
+
+class PageExport:
+    '''
+    Reads one page through a named (server-side) cursor, ITERSIZE rows per
+    round trip, and encodes each batch as soon as it arrives. Only the
+    encoded page is held in memory, never the full result.
+    '''
+
+    def __init__(self, export_format: str, header: bool):
+        self.encode = ENCODERS[export_format]
+        self.header = header
+        self.rows = 0
+        self.last_id: Optional[int] = None
+
+    def write(self, conn: Any, query: str, values: tuple) -> Iterator[str]:
+        cur = conn.cursor(name=f'export_{uuid.uuid4().hex}')
+        cur.itersize = ITERSIZE
+        try:
+            cur.execute(query, values)
+            while True:
+                with span('db.fetch'):
+                    rows = cur.fetchmany(ITERSIZE)
+                if not rows:
+                    break
+                with span('serialize'):
+                    chunk = self.encode(rows, self.header and self.rows == 0)
+                self.rows += len(rows)
+                self.last_id = rows[-1][0]
+                yield chunk
+            if self.header and self.rows == 0:
+                yield self.encode([], True)
+        finally:
+            cur.close()
@@ -0,0 +1,154 @@
+import hmac
+import json
+import os
+from typing import Dict, Any, Optional
+
+from timing import instrumented
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Export job applications as CSV or NDJSON, or search them by keywords (q) or fuzzy name (name)
+    Args: event with httpMethod, X-Export-Token header, queryStringParameters
+          q or name for search; format, created_from, created_to for export;
+          application_type, limit, cursor for both
+          context with request_id
+    Returns: HTTP response with ranked search results as JSON, or the export page as body and X-Next-Cursor while more rows remain
+    '''
+    method: str = event.get('httpMethod', 'GET')
+
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Export-Token',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': ''
+        }
+
+    if method != 'GET':
+        return {
+            'statusCode': 405,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+
+    export_token = os.environ.get('EXPORT_TOKEN')
+    if not export_token:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'EXPORT_TOKEN not configured'}),
+            'isBase64Encoded': False
+        }
+
+    if not hmac.compare_digest(get_header(event, 'X-Export-Token') or '', export_token):
+        return {
+            'statusCode': 401,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Invalid export token'}),
+            'isBase64Encoded': False
+        }
+
+    from db import get_router
+    from export import DEFAULT_PAGE_ROWS, FORMATS, MAX_PAGE_ROWS, PageExport, export_filters, export_query
+    from pagination import InvalidPageRequest, decode_cursor, encode_cursor, parse_limit
+    from search import run_search, search_query, search_request, trigrams_installed
+
+    params = event.get('queryStringParameters') or {}
+    try:
+        search = search_request(params)
+        if search is not None:
+            kind, text, application_type, scope = search
+            limit = parse_limit(params)
+            after = decode_cursor(params.get('cursor'), scope)
+            if after is not None and not isinstance(after[0], (int, float)):
+                raise InvalidPageRequest('Invalid cursor')
+        else:
+            scope, filters = export_filters(params)
+            limit = parse_limit(params, DEFAULT_PAGE_ROWS, MAX_PAGE_ROWS)
+            after = decode_cursor(params.get('cursor'), scope)
+    except InvalidPageRequest as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)}),
+            'isBase64Encoded': False
+        }
+
+    if search is not None:
+        query, values = search_query(kind, text, application_type, after, limit)
+        with get_router().connection(read_only=True) as conn:
+            if kind == 'name' and not trigrams_installed(conn):
+                conn.commit()
+                return {
+                    'statusCode': 501,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'error': 'Name search is not available: the pg_trgm extension is not installed'}),
+                    'isBase64Encoded': False
+                }
+            items, last = run_search(conn, query, values, limit)
+            conn.commit()
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Cache-Control': 'no-store'
+            },
+            'body': json.dumps({
+                'applications': items,
+                'next_cursor': encode_cursor(scope, last) if last else None
+            }, ensure_ascii=False),
+            'isBase64Encoded': False
+        }
+
+    page = PageExport(filters['format'], header=after is None)
+    query, values = export_query(filters, after[1] if after else 0, limit)
+    with get_router().connection(read_only=True) as conn:
+        body = ''.join(page.write(conn, query, values))
+        conn.commit()
+
+    headers = {
+        'Content-Type': FORMATS[filters['format']],
+        'Content-Disposition': f"attachment; filename=\"applications.{filters['format']}\"",
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Next-Cursor, X-Row-Count',
+        'X-Row-Count': str(page.rows)
+    }
+    if page.rows == limit:
+        headers['X-Next-Cursor'] = encode_cursor(scope, [filters['format'], page.last_id])
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': False
+    }
@@ -0,0 +1,117 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from pagination import InvalidPageRequest
+from timing import span
+
+MAX_QUERY_LENGTH = 200
+
+RESULT_COLUMNS = [
+    'id', 'application_type', 'name', 'surname', 'email', 'phone',
+    'position', 'experience', 'university', 'course', 'specialty', 'direction',
+    'created_at',
+]
+
+# Full-text match on the generated search_vector column (idx_applications_search_vector).
+# websearch_to_tsquery accepts "quoted phrases", OR and -exclusions and never raises on user input.
+TEXT_MATCH = '''
+    FROM applications, websearch_to_tsquery('russian', %s) AS query
+    WHERE search_vector @@ query
+'''
+TEXT_SCORE = 'ts_rank(search_vector, query)::float8'
+
+# Fuzzy name lookup: the query is compared with the closest run of words in
+# "name surname", answered by idx_applications_full_name_trgm. Needs pg_trgm,
+# which V0011 only installs where the server provides it.
+FULL_NAME = "(name || ' ' || surname)"
+NAME_MATCH = f'''
+    FROM applications
+    WHERE %s <%% {FULL_NAME}
+'''
+NAME_SCORE = f'word_similarity(%s, {FULL_NAME})::float8'
+
+APPLICATION_TYPES = ('applicant', 'student')
+
+_trigrams = False
+
+
+def search_request(params: Dict[str, Any]) -> Optional[Tuple[str, str, Optional[str], str]]:
+    '''
+    (kind, text, application_type, scope) for ?q= (full-text) or ?name=
+    (fuzzy), None when neither is given. The scope binds cursors to the
+    query without copying it into the token.
+    '''
+    kind = 'text' if params.get('q') else 'name' if params.get('name') else None
+    if kind is None:
+        return None
+    text = (params.get('q') or params.get('name')).strip()
+    if not text or len(text) > MAX_QUERY_LENGTH:
+        raise InvalidPageRequest(f'Search query must be 1 to {MAX_QUERY_LENGTH} characters')
+    application_type = params.get('application_type') or None
+    if application_type is not None and application_type not in APPLICATION_TYPES:
+        raise InvalidPageRequest('application_type must be applicant or student')
+    digest = hashlib.sha1(f'{kind}:{application_type}:{text}'.encode('utf-8')).hexdigest()[:16]
+    return kind, text, application_type, f'search:{digest}'
+
+
+def trigrams_installed(conn: Any) -> bool:
+    '''
+    Whether pg_trgm is installed. A positive answer is kept for the warm
+    container, a negative one is checked again so installing the extension
+    needs no restart.
+    '''
+    global _trigrams
+    if not _trigrams:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigrams = cur.fetchone() is not None
+    return _trigrams
+
+
+def search_query(kind: str, text: str, application_type: Optional[str],
+                 after: Optional[List[Any]], limit: int) -> Tuple[str, tuple]:
+    '''
+    Ranked page ordered by (rank DESC, id DESC). Ranks are compared as
+    float8 so the value carried in the cursor round-trips exactly.
+    '''
+    match, score = (TEXT_MATCH, TEXT_SCORE) if kind == 'text' else (NAME_MATCH, NAME_SCORE)
+    values: List[Any] = [text] if kind == 'text' else [text, text]
+    conditions = []
+    if application_type:
+        conditions.append('AND application_type = %s')
+        values.append(application_type)
+    keyset = ''
+    if after is not None:
+        keyset = 'WHERE (rank, id) < (%s::float8, %s)'
+        values.extend(after)
+    values.append(limit + 1)
+    return f'''
+        SELECT {', '.join(RESULT_COLUMNS)}, rank
+        FROM (
+            SELECT {', '.join(RESULT_COLUMNS)}, {score} AS rank
+            {match}
+            {' '.join(conditions)}
+        ) ranked
+        {keyset}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    ''', tuple(values)
+
+
+def run_search(conn: Any, query: str, values: tuple, limit: int) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+    '''Rows of one page and the sort key of its last row when another page follows'''
+    with conn.cursor() as cur:
+        cur.execute(query, values)
+        with span('db.fetch'):
+            rows = cur.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    columns = RESULT_COLUMNS + ['rank']
+    with span('serialize'):
+        items = [
+            {column: value.isoformat() if isinstance(value, datetime) else value for column, value in zip(columns, row)}
+            for row in rows
+        ]
+    last = [rows[-1][-1], rows[-1][0]] if has_more else None
+    return items, last
@@ -0,0 +1,109 @@
+import json
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Any, Iterator, List, Optional
+
+# Fraction of requests whose SQL statements are also run under EXPLAIN (ANALYZE, BUFFERS), off by default
+EXPLAIN_SAMPLE_RATE = float(os.environ.get('EXPLAIN_SAMPLE_RATE', '0'))
+REQUEST_LOG = os.environ.get('REQUEST_LOG', 'true').lower() != 'false'
+
+
+class RequestTimer:
+    '''Named spans of one invocation, summed per name'''
+
+    def __init__(self, explain: bool = False):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}
+        self.explain = explain
+        self.plans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        '''Server-Timing header value, one metric per span name plus the total'''
+        metrics = []
+        for name, (seconds, count) in self.spans.items():
+            metric = f'{name};dur={seconds * 1000:.2f}'
+            if count > 1:
+                metric += f';desc="x{count}"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={self.elapsed_ms():.2f}')
+        return ', '.join(metrics)
+
+
+_current: ContextVar[Optional[RequestTimer]] = ContextVar('request_timer', default=None)
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    '''Time a block into the current request, a no-op outside an instrumented handler'''
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    '''Connection pool counters of a function that has opened a pool, without importing db otherwise'''
+    db = sys.modules.get('db')
+    return db.pool_stats() if db is not None and hasattr(db, 'pool_stats') else None
+
+
+def log_request(event: Dict[str, Any], context: Any, response: Optional[Dict[str, Any]], timer: RequestTimer) -> None:
+    '''One JSON line per invocation on stdout, where the platform collects function logs'''
+    record: Dict[str, Any] = {
+        'request_id': getattr(context, 'request_id', None),
+        'function': getattr(context, 'function_name', None),
+        'method': event.get('httpMethod'),
+        'resource': (event.get('queryStringParameters') or {}).get('resource'),
+        'status': response['statusCode'] if response else 500,
+        'duration_ms': round(timer.elapsed_ms(), 2),
+        'spans': {name: {'ms': round(seconds * 1000, 2), 'count': count} for name, (seconds, count) in timer.spans.items()},
+    }
+    pool = pool_stats()
+    if pool is not None:
+        record['pool'] = pool
+    if timer.plans:
+        record['explain'] = timer.plans
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+
+def instrumented(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    '''Wrap a cloud function handler: collect spans, add Server-Timing and log the request'''
+    @wraps(handler)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        timer = RequestTimer(explain=EXPLAIN_SAMPLE_RATE > 0 and random.random() < EXPLAIN_SAMPLE_RATE)
+        token = _current.set(timer)
+        response = None
+        try:
+            response = handler(event, context)
+            return response
+        finally:
+            _current.reset(token)
+            if response is not None:
+                headers = response.setdefault('headers', {})
+                headers['Server-Timing'] = timer.server_timing()
+                headers['Timing-Allow-Origin'] = '*'
+            if REQUEST_LOG:
+                log_request(event, context, response, timer)
+    return wrapper
@@ -0,0 +1,194 @@
+from datetime import date
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+MAX_BULK_ROWS = 1000
+
+# Fields a batch task patch may change and their SQL types
+TASK_PATCH_FIELDS = {
+    'employee_id': 'integer',
+    'status': 'varchar',
+    'title': 'varchar',
+}
+
+TASK_RETURNING = '''
+    t.id, t.group_id, t.employee_id, t.title, t.description, t.status, t.priority,
+    t.due_date, t.created_at, t.completed_at
+'''
+
+# column -> (required, kind, default); kind is 'str', 'int' or 'date'
+BULK_SCHEMAS: Dict[str, Dict[str, Tuple[bool, str, Any]]] = {
+    'employees': {
+        'group_id': (False, 'int', None),
+        'name': (True, 'str', None),
+        'position': (False, 'str', None),
+        'email': (False, 'str', None),
+        'phone': (False, 'str', None),
+        'status': (False, 'str', 'active'),
+        'hired_date': (False, 'date', None),
+    },
+    'tasks': {
+        'group_id': (False, 'int', None),
+        'employee_id': (False, 'int', None),
+        'title': (True, 'str', None),
+        'description': (False, 'str', None),
+        'status': (False, 'str', 'todo'),
+        'priority': (False, 'str', 'medium'),
+        'due_date': (False, 'date', None),
+    },
+}
+
+
+def _check_value(kind: str, value: Any) -> Optional[str]:
+    if kind == 'int' and (not isinstance(value, int) or isinstance(value, bool)):
+        return 'must be an integer'
+    if kind == 'str' and not isinstance(value, str):
+        return 'must be a string'
+    if kind == 'date':
+        try:
+            date.fromisoformat(value)
+        except (TypeError, ValueError):
+            return 'must be an ISO date'
+    return None
+
+
+def validate_rows(resource: str, items: List[Any]) -> Tuple[List[Tuple[int, tuple]], List[Dict[str, Any]]]:
+    '''Validate a bulk payload in one pass, returning (input index, values) pairs and per-row errors'''
+    schema = BULK_SCHEMAS[resource]
+    rows: List[Tuple[int, tuple]] = []
+    errors: List[Dict[str, Any]] = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'row must be an object'})
+            continue
+        values = []
+        row_errors = []
+        for column, (required, kind, default) in schema.items():
+            value = item.get(column)
+            if value is None or (required and value == ''):
+                if required:
+                    row_errors.append(f'{column} is required')
+                values.append(default)
+                continue
+            problem = _check_value(kind, value)
+            if problem:
+                row_errors.append(f'{column} {problem}')
+            values.append(value)
+        if row_errors:
+            errors.append({'index': index, 'error': '; '.join(row_errors)})
+        else:
+            rows.append((index, tuple(values)))
+
+    return rows, errors
+
+
+def missing_ids(cur: Any, table: str, ids: Set[Optional[int]]) -> Set[int]:
+    wanted = {value for value in ids if value is not None}
+    if not wanted:
+        return set()
+    cur.execute(f'SELECT id FROM {table} WHERE id = ANY(%s)', (list(wanted),))
+    return wanted - {found for (found,) in cur.fetchall()}
+
+
+def check_references(cur: Any, resource: str, rows: List[Tuple[int, tuple]]) -> List[Dict[str, Any]]:
+    '''Report rows pointing at groups or employees that do not exist, with one query per table'''
+    columns = list(BULK_SCHEMAS[resource])
+    references = [('group_id', 'groups')]
+    if resource == 'tasks':
+        references.append(('employee_id', 'employees'))
+
+    errors: List[Dict[str, Any]] = []
+    for column, table in references:
+        position = columns.index(column)
+        missing = missing_ids(cur, table, {row[position] for _, row in rows})
+        for index, row in rows:
+            if row[position] in missing:
+                errors.append({'index': index, 'error': f'{column} {row[position]} does not exist'})
+    return sorted(errors, key=lambda error: error['index'])
+
+
+def insert_rows(cur: Any, resource: str, rows: List[tuple]) -> List[int]:
+    '''Insert all rows with a single multi-row VALUES statement, ids come back in input order'''
+    from psycopg2.extras import execute_values
+    columns = ', '.join(BULK_SCHEMAS[resource])
+    result = execute_values(
+        cur,
+        f'INSERT INTO {resource} ({columns}) VALUES %s RETURNING id',
+        rows,
+        page_size=len(rows),
+        fetch=True,
+    )
+    return [row[0] for row in result]
+
+
+def validate_task_patches(cur: Any, items: List[Any]) -> Tuple[Dict[Tuple[str, ...], List[tuple]], List[Dict[str, Any]]]:
+    '''Check a batch of task patches and group them by the set of fields they change'''
+    shapes: Dict[Tuple[str, ...], List[tuple]] = {}
+    errors: List[Dict[str, Any]] = []
+    seen: Set[int] = set()
+    employees: Dict[int, int] = {}
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'patch must be an object'})
+            continue
+        item_id = item.get('id')
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            errors.append({'index': index, 'error': 'id must be an integer'})
+            continue
+        if item_id in seen:
+            errors.append({'index': index, 'error': f'task {item_id} appears more than once'})
+            continue
+        seen.add(item_id)
+
+        fields = tuple(field for field in TASK_PATCH_FIELDS if field in item)
+        if not fields:
+            errors.append({'index': index, 'error': 'nothing to update'})
+            continue
+        problems = []
+        if 'status' in item and not (isinstance(item['status'], str) and item['status']):
+            problems.append('status must be a non-empty string')
+        if 'title' in item and not (isinstance(item['title'], str) and item['title']):
+            problems.append('title must be a non-empty string')
+        if 'employee_id' in item and item['employee_id'] is not None:
+            problem = _check_value('int', item['employee_id'])
+            if problem:
+                problems.append(f'employee_id {problem}')
+            else:
+                employees[index] = item['employee_id']
+        if problems:
+            errors.append({'index': index, 'error': '; '.join(problems)})
+            continue
+        shapes.setdefault(fields, []).append((item_id,) + tuple(item[field] for field in fields))
+
+    missing = missing_ids(cur, 'employees', set(employees.values()))
+    errors.extend(
+        {'index': index, 'error': f'employee_id {employee_id} does not exist'}
+        for index, employee_id in employees.items() if employee_id in missing
+    )
+    return shapes, sorted(errors, key=lambda error: error['index'])
+
+
+def apply_task_patches(cur: Any, shapes: Dict[Tuple[str, ...], List[tuple]]) -> List[tuple]:
+    '''One UPDATE ... FROM (VALUES ...) per field set, returns the affected task rows'''
+    from psycopg2.extras import execute_values
+    affected: List[tuple] = []
+    for fields, rows in shapes.items():
+        assignments = [f'{field} = v.{field}' for field in fields]
+        if 'status' in fields:
+            assignments.append("completed_at = CASE WHEN v.status = 'completed' THEN CURRENT_TIMESTAMP ELSE t.completed_at END")
+        template = '(' + ', '.join(['%s::integer'] + [f'%s::{TASK_PATCH_FIELDS[field]}' for field in fields]) + ')'
+        affected.extend(execute_values(
+            cur,
+            f'''
+                UPDATE tasks t SET {', '.join(assignments)}
+                FROM (VALUES %s) AS v(id, {', '.join(fields)})
+                WHERE t.id = v.id
+                RETURNING {TASK_RETURNING}
+            ''',
+            rows,
+            template=template,
+            page_size=len(rows),
+            fetch=True,
+        ))
+    return affected
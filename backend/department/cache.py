@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from statements import Statement
+
+# Query parameters that change the representation of a listing
+KEY_PARAMS = ('group_id', 'employee_id', 'limit', 'cursor')
+
+
+class LocalBackend:
+    '''In-memory stand-in for a shared cache service, used in tests and local runs'''
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+
+class RedisBackend:
+    '''Shared cache in Redis, needs the redis package when CACHE_REDIS_URL is set'''
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self._client.set(key, value, ex=ttl)
+
+
+class ResponseCache:
+    '''
+    Two-level cache of serialized listings keyed by ETag: a bounded LRU kept
+    in the warm container and an optional shared backend behind it.
+    '''
+
+    def __init__(self, backend: Any = None, max_entries: int = 256, ttl: int = 300):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def get(self, etag: str) -> Optional[str]:
+        with self._lock:
+            body = self._local.get(etag)
+            if body is not None:
+                self._local.move_to_end(etag)
+                self.stats['local_hits'] += 1
+                return body
+        if self.backend is not None:
+            body = self.backend.get(f'department:{etag}')
+            if body is not None:
+                self._remember(etag, body)
+                self.stats['shared_hits'] += 1
+                return body
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, etag: str, body: str) -> None:
+        self._remember(etag, body)
+        if self.backend is not None:
+            self.backend.set(f'department:{etag}', body, self.ttl)
+
+    def _remember(self, etag: str, body: str) -> None:
+        with self._lock:
+            self._local[etag] = body
+            self._local.move_to_end(etag)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+def cache_scopes(resource: str, group_id: Optional[str]) -> List[str]:
+    '''Version scopes a listing depends on'''
+    if resource == 'groups':
+        return ['groups', 'employees', 'tasks']
+    if resource == 'employees':
+        return [f'employees:{group_id}'] if group_id else ['employees']
+    if resource in ('tasks', 'stats'):
+        return [f'tasks:{group_id}' if group_id else 'tasks', 'employees']
+    return [resource]
+
+
+def write_scopes(resource: str, group_ids: Iterable[Optional[int]]) -> List[str]:
+    '''Version scopes to bump after writing rows of resource in the given groups'''
+    scopes = {resource}
+    scopes.update(f'{resource}:{group_id}' for group_id in group_ids if group_id is not None)
+    return sorted(scopes)
+
+
+READ_VERSIONS = Statement('cache_read_versions', '''
+    SELECT scope, version FROM cache_versions WHERE scope = ANY($1::varchar[])
+''')
+
+BUMP_VERSIONS = Statement('cache_bump_versions', '''
+    INSERT INTO cache_versions (scope, version)
+    SELECT unnest($1::varchar[]), 1
+    ON CONFLICT (scope) DO UPDATE SET version = cache_versions.version + 1
+''')
+
+
+def read_versions(cur: Any, scopes: List[str]) -> Dict[str, int]:
+    READ_VERSIONS.execute(cur, (scopes,))
+    versions = {scope: 0 for scope in scopes}
+    versions.update(cur.fetchall())
+    return versions
+
+
+def bump_versions(cur: Any, scopes: List[str]) -> None:
+    '''Bump scope versions inside the caller's write transaction'''
+    BUMP_VERSIONS.execute(cur, (scopes,))
+
+
+def make_etag(resource: str, params: Dict[str, Any], versions: Dict[str, int]) -> str:
+    key = [resource, [params.get(name) for name in KEY_PARAMS], sorted(versions.items())]
+    digest = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_cache() -> ResponseCache:
+    '''Module-level response cache that survives across warm invocations'''
+    global _cache
+    if _cache is None:
+        redis_url = os.environ.get('CACHE_REDIS_URL')
+        _cache = ResponseCache(
+            backend=RedisBackend(redis_url) if redis_url else None,
+            max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '256')),
+            ttl=int(os.environ.get('CACHE_TTL', '300')),
+        )
+    return _cache
+
+
+def set_backend(backend: Any) -> None:
+    '''Plug a shared backend (e.g. LocalBackend in tests) into the module cache'''
+    get_cache().backend = backend
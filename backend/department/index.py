@@ -1,8 +1,333 @@
 import json
-import os
-import psycopg2
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
 
+from bulk import BULK_SCHEMAS, MAX_BULK_ROWS, apply_task_patches, check_references, insert_rows, validate_rows, validate_task_patches
+from cache import bump_versions, cache_scopes, etag_matches, get_cache, make_etag, read_versions, write_scopes
+from pagination import InvalidPageRequest, decode_cursor, encode_cursor, parse_limit
+from serializer import ArrayWriter, open_cursor
+from statements import Statement
+from stats import stats_window, task_stats
+from sync import SyncTokenExpired, changes_filter, deleted_ids, read_state, sync_scope
+from timing import instrumented, span
+
+EMPLOYEE_COLUMNS = '''
+    e.id, e.group_id, e.name, e.position, e.email, e.phone, e.status,
+    e.hired_date, e.created_at, g.name as group_name
+'''
+
+TASK_COLUMNS = '''
+    t.id, t.group_id, t.employee_id, t.title, t.description, t.status, t.priority,
+    t.due_date, t.created_at, t.completed_at, e.name as employee_name, g.name as group_name
+'''
+
+# Delta-sync sources: table alias and SELECT with the listing columns plus updated_at
+SYNC_SOURCES = {
+    'employees': ('e', f'''
+        SELECT {EMPLOYEE_COLUMNS}, e.updated_at
+        FROM employees e
+        LEFT JOIN groups g ON e.group_id = g.id
+    '''),
+    'tasks': ('t', f'''
+        SELECT {TASK_COLUMNS}, t.updated_at
+        FROM tasks t
+        LEFT JOIN employees e ON t.employee_id = e.id
+        LEFT JOIN groups g ON t.group_id = g.id
+    '''),
+}
+
+# Keyset pages of employees ordered by (group_id, id), the first page starts after (0, 0)
+EMPLOYEES_PAGE = Statement('employees_page', f'''
+    SELECT {EMPLOYEE_COLUMNS}
+    FROM employees e
+    LEFT JOIN groups g ON e.group_id = g.id
+    WHERE (e.group_id, e.id) > ($1, $2)
+    ORDER BY e.group_id, e.id
+    LIMIT $3
+''')
+
+EMPLOYEES_GROUP_PAGE = Statement('employees_group_page', f'''
+    SELECT {EMPLOYEE_COLUMNS}
+    FROM employees e
+    LEFT JOIN groups g ON e.group_id = g.id
+    WHERE e.group_id = $1 AND e.id > $2
+    ORDER BY e.id
+    LIMIT $3
+''')
+
+EMPLOYEES_UNGROUPED_PAGE = Statement('employees_ungrouped_page', f'''
+    SELECT {EMPLOYEE_COLUMNS}
+    FROM employees e
+    LEFT JOIN groups g ON e.group_id = g.id
+    WHERE e.group_id IS NULL AND e.id > $1
+    ORDER BY e.id
+    LIMIT $2
+''')
+
+# Keyset pages of tasks newest first by (created_at, id), the first page starts before ('infinity', MAX_ID)
+TASKS_PAGE = Statement('tasks_page', f'''
+    SELECT {TASK_COLUMNS}
+    FROM tasks t
+    LEFT JOIN employees e ON t.employee_id = e.id
+    LEFT JOIN groups g ON t.group_id = g.id
+    WHERE (t.created_at, t.id) < ($1, $2)
+    ORDER BY t.created_at DESC, t.id DESC
+    LIMIT $3
+''')
+
+TASKS_GROUP_PAGE = Statement('tasks_group_page', f'''
+    SELECT {TASK_COLUMNS}
+    FROM tasks t
+    LEFT JOIN employees e ON t.employee_id = e.id
+    LEFT JOIN groups g ON t.group_id = g.id
+    WHERE t.group_id = $1 AND (t.created_at, t.id) < ($2, $3)
+    ORDER BY t.created_at DESC, t.id DESC
+    LIMIT $4
+''')
+
+MAX_ID = 2 ** 31 - 1
+
+EMPLOYEE_INSERT = Statement('employee_insert', '''
+    INSERT INTO employees (group_id, name, position, email, phone, status, hired_date)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    RETURNING id
+''')
+
+TASK_INSERT = Statement('task_insert', '''
+    INSERT INTO tasks (group_id, employee_id, title, description, status, priority, due_date)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    RETURNING id
+''')
+
+# Canonical single-row updates: every column comes as a (given, value) pair, so one
+# prepared shape covers any subset of fields, including explicit nulls
+TASK_UPDATE = Statement('task_update', '''
+    UPDATE tasks SET
+        status = CASE WHEN $1 THEN $2 ELSE status END,
+        completed_at = CASE WHEN $1 AND $2 = 'completed' THEN CURRENT_TIMESTAMP ELSE completed_at END,
+        title = CASE WHEN $3 THEN $4 ELSE title END,
+        employee_id = CASE WHEN $5 THEN $6 ELSE employee_id END
+    WHERE id = $7
+    RETURNING group_id
+''')
+TASK_UPDATE_FIELDS = ('status', 'title', 'employee_id')
+
+EMPLOYEE_UPDATE = Statement('employee_update', '''
+    UPDATE employees SET
+        name = CASE WHEN $1 THEN $2 ELSE name END,
+        position = CASE WHEN $3 THEN $4 ELSE position END,
+        email = CASE WHEN $5 THEN $6 ELSE email END,
+        phone = CASE WHEN $7 THEN $8 ELSE phone END,
+        status = CASE WHEN $9 THEN $10 ELSE status END
+    WHERE id = $11
+    RETURNING group_id
+''')
+EMPLOYEE_UPDATE_FIELDS = ('name', 'position', 'email', 'phone', 'status')
+
+def update_values(fields: tuple, body_data: Dict[str, Any], item_id: Any) -> Optional[List[Any]]:
+    '''(given, value) pairs for a canonical UPDATE followed by the id, None when no field is given'''
+    if not any(field in body_data for field in fields):
+        return None
+    values: List[Any] = []
+    for field in fields:
+        values.extend([field in body_data, body_data.get(field)])
+    values.append(item_id)
+    return values
+
+def employee_page_cursors(conn: Any, group_id: Optional[str], after: Optional[List[Any]], limit: int, writer: ArrayWriter) -> Iterator[Any]:
+    '''
+    Cursors for a keyset page of employees ordered by (group_id, id), one extra row signals more data.
+    Employees without a group sort last and are read in a second range scan once the first is exhausted.
+    '''
+    if group_id:
+        yield EMPLOYEES_GROUP_PAGE.open(conn, (group_id, after[1] if after else 0, limit + 1))
+        return
+    
+    if after is None or after[0] is not None:
+        start = (after[0], after[1]) if after else (0, 0)
+        yield EMPLOYEES_PAGE.open(conn, (*start, limit + 1))
+    
+    if not writer.has_more:
+        yield EMPLOYEES_UNGROUPED_PAGE.open(conn, (after[1] if after and after[0] is None else 0, limit + 1 - writer.written))
+
+def task_page_cursor(conn: Any, group_id: Optional[str], after: Optional[List[Any]], limit: int) -> Any:
+    '''Cursor for a keyset page of tasks, newest first by (created_at, id)'''
+    before: List[Any] = ['infinity', MAX_ID]
+    if after:
+        try:
+            before = [datetime.fromisoformat(after[0]), after[1]]
+        except (TypeError, ValueError):
+            raise InvalidPageRequest('Invalid cursor')
+    if group_id:
+        return TASKS_GROUP_PAGE.open(conn, (group_id, *before, limit + 1))
+    return TASKS_PAGE.open(conn, (*before, limit + 1))
+
+def list_groups(conn: Any, params: Dict[str, Any]) -> Iterator[str]:
+    writer = ArrayWriter()
+    # The only unbounded listing keeps its named cursor: DECLARE only takes a query, not EXECUTE
+    cur = open_cursor(conn, '''
+        SELECT id, name, description, created_at,
+               employee_count, task_count,
+               todo_count, in_progress_count, completed_count
+        FROM groups
+        ORDER BY id
+    ''', server_side=True)
+    try:
+        yield '{"groups": ['
+        yield from writer.write(cur)
+        yield ']}'
+    finally:
+        cur.close()
+
+def list_employees(conn: Any, params: Dict[str, Any]) -> Iterator[str]:
+    limit = parse_limit(params)
+    after = decode_cursor(params.get('cursor'), 'employees')
+    if after is not None and after[0] is not None and (not isinstance(after[0], int) or isinstance(after[0], bool)):
+        raise InvalidPageRequest('Invalid cursor')
+    writer = ArrayWriter(limit)
+    yield '{"employees": ['
+    for cur in employee_page_cursors(conn, params.get('group_id'), after, limit, writer):
+        try:
+            yield from writer.write(cur)
+        finally:
+            cur.close()
+    
+    next_cursor = None
+    if writer.has_more:
+        next_cursor = encode_cursor('employees', [writer.last_value('group_id'), writer.last_value('id')])
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+def list_tasks(conn: Any, params: Dict[str, Any]) -> Iterator[str]:
+    limit = parse_limit(params)
+    after = decode_cursor(params.get('cursor'), 'tasks')
+    writer = ArrayWriter(limit)
+    cur = task_page_cursor(conn, params.get('group_id'), after, limit)
+    try:
+        yield '{"tasks": ['
+        yield from writer.write(cur)
+    finally:
+        cur.close()
+    
+    next_cursor = None
+    if writer.has_more:
+        next_cursor = encode_cursor('tasks', [writer.last_value('created_at').isoformat(), writer.last_value('id')])
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+def list_changes(conn: Any, cur: Any, resource: str, params: Dict[str, Any]) -> Iterator[str]:
+    '''
+    Rows changed since the ?since= token in (updated_at, id) order and the ids deleted since,
+    with the token to poll with next. An empty since returns every row and starts the sync.
+    '''
+    limit = parse_limit(params)
+    group_id = params.get('group_id')
+    scope = sync_scope(resource, group_id)
+    state = read_state(cur, scope, params.get('since'))
+    deleted = []
+    if state.since is not None and state.cycle_start:
+        deleted = deleted_ids(cur, resource, group_id, state.since)
+    
+    alias, select = SYNC_SOURCES[resource]
+    where, values = changes_filter(alias, group_id, state, limit)
+    writer = ArrayWriter(limit)
+    rows_cur = open_cursor(conn, select + where, values)
+    try:
+        yield '{' + json.dumps(resource) + ': ['
+        yield from writer.write(rows_cur)
+    finally:
+        rows_cur.close()
+    
+    last = (writer.last_value('updated_at'), writer.last_value('id')) if writer.has_more else None
+    yield '], "deleted": ' + json.dumps(deleted)
+    yield ', "next_since": ' + json.dumps(state.next_token(scope, last))
+    yield ', "has_more": ' + json.dumps(writer.has_more) + '}'
+
+LISTINGS = {
+    'groups': list_groups,
+    'employees': list_employees,
+    'tasks': list_tasks,
+    'stats': task_stats,
+}
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def bulk_create(conn: Any, cur: Any, resource: str, items: List[Any]) -> Dict[str, Any]:
+    '''Validate an array payload in one pass and insert it in a single transaction'''
+    if not items or len(items) > MAX_BULK_ROWS:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': f'Bulk payload must contain 1 to {MAX_BULK_ROWS} rows'})
+        }
+    
+    rows, errors = validate_rows(resource, items)
+    if not errors:
+        errors = check_references(cur, resource, rows)
+    if errors:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'success': False, 'errors': errors})
+        }
+    
+    values = [row for _, row in rows]
+    ids = insert_rows(cur, resource, values)
+    group_position = list(BULK_SCHEMAS[resource]).index('group_id')
+    bump_versions(cur, write_scopes(resource, {row[group_position] for row in values}))
+    conn.commit()
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'success': True, 'ids': ids})
+    }
+
+def batch_update_tasks(conn: Any, cur: Any, patches: List[Any]) -> Dict[str, Any]:
+    '''Apply many task patches in one transaction, one statement per field set'''
+    if not patches or len(patches) > MAX_BULK_ROWS:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': f'Batch must contain 1 to {MAX_BULK_ROWS} patches'})
+        }
+    
+    shapes, errors = validate_task_patches(cur, patches)
+    if errors:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'success': False, 'errors': errors})
+        }
+    
+    rows = apply_task_patches(cur, shapes)
+    columns = [desc[0] for desc in cur.description]
+    tasks = [dict(zip(columns, row)) for row in rows]
+    bump_versions(cur, write_scopes('tasks', {task['group_id'] for task in tasks}))
+    conn.commit()
+    
+    for task in tasks:
+        if task.get('created_at'):
+            task['created_at'] = task['created_at'].isoformat()
+        if task.get('completed_at'):
+            task['completed_at'] = task['completed_at'].isoformat()
+        if task.get('due_date'):
+            task['due_date'] = task['due_date'].isoformat()
+    
+    updated = {task['id'] for task in tasks}
+    not_found = [patch['id'] for patch in patches if patch['id'] not in updated]
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'success': True, 'tasks': tasks, 'not_found': not_found})
+    }
+
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: API для управления отделом, группами, сотрудниками и задачами
@@ -18,124 +343,82 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match, X-Read-Your-Writes',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
         }
     
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
+    from db import get_router
+    
+    params = event.get('queryStringParameters') or {}
+    # Delta sync stays on the primary, its watermark needs the primary's open transactions
+    read_only = method == 'GET' and 'since' not in params
+    read_your_writes = (get_header(event, 'X-Read-Your-Writes') or '').lower() in ('1', 'true')
+    pool, conn = get_router().getconn(read_only, read_your_writes)
     cur = conn.cursor()
     
     try:
-        params = event.get('queryStringParameters') or {}
         resource = params.get('resource', 'groups')
         
-        if method == 'GET':
-            if resource == 'groups':
-                cur.execute('''
-                    SELECT g.id, g.name, g.description, g.created_at,
-                           COUNT(DISTINCT e.id) as employee_count,
-                           COUNT(DISTINCT t.id) as task_count
-                    FROM groups g
-                    LEFT JOIN employees e ON g.id = e.group_id
-                    LEFT JOIN tasks t ON g.id = t.group_id
-                    GROUP BY g.id, g.name, g.description, g.created_at
-                    ORDER BY g.id
-                ''')
-                columns = [desc[0] for desc in cur.description]
-                groups = [dict(zip(columns, row)) for row in cur.fetchall()]
-                
-                for group in groups:
-                    if group['created_at']:
-                        group['created_at'] = group['created_at'].isoformat()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'groups': groups})
-                }
+        if method == 'GET' and resource in SYNC_SOURCES and 'since' in params:
+            body = ''.join(list_changes(conn, cur, resource, params))
+            conn.commit()
             
-            elif resource == 'employees':
-                group_id = params.get('group_id')
-                if group_id:
-                    cur.execute('''
-                        SELECT e.*, g.name as group_name
-                        FROM employees e
-                        LEFT JOIN groups g ON e.group_id = g.id
-                        WHERE e.group_id = %s
-                        ORDER BY e.id
-                    ''', (group_id,))
-                else:
-                    cur.execute('''
-                        SELECT e.*, g.name as group_name
-                        FROM employees e
-                        LEFT JOIN groups g ON e.group_id = g.id
-                        ORDER BY e.group_id, e.id
-                    ''')
-                
-                columns = [desc[0] for desc in cur.description]
-                employees = [dict(zip(columns, row)) for row in cur.fetchall()]
-                
-                for emp in employees:
-                    if emp.get('created_at'):
-                        emp['created_at'] = emp['created_at'].isoformat()
-                    if emp.get('hired_date'):
-                        emp['hired_date'] = emp['hired_date'].isoformat()
-                
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', 'Cache-Control': 'no-store'},
+                'body': body
+            }
+        
+        elif method == 'GET' and resource in LISTINGS:
+            versions = read_versions(cur, cache_scopes(resource, params.get('group_id')))
+            if resource == 'stats':
+                versions['stats_window'] = stats_window()
+            etag = make_etag(resource, params, versions)
+            cache_headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Access-Control-Expose-Headers': 'ETag'}
+            
+            if etag_matches(get_header(event, 'If-None-Match'), etag):
                 return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'employees': employees})
+                    'statusCode': 304,
+                    'headers': {'Access-Control-Allow-Origin': '*', **cache_headers},
+                    'body': ''
                 }
             
-            elif resource == 'tasks':
-                group_id = params.get('group_id')
-                if group_id:
-                    cur.execute('''
-                        SELECT t.*, e.name as employee_name, g.name as group_name
-                        FROM tasks t
-                        LEFT JOIN employees e ON t.employee_id = e.id
-                        LEFT JOIN groups g ON t.group_id = g.id
-                        WHERE t.group_id = %s
-                        ORDER BY t.id DESC
-                    ''', (group_id,))
-                else:
-                    cur.execute('''
-                        SELECT t.*, e.name as employee_name, g.name as group_name
-                        FROM tasks t
-                        LEFT JOIN employees e ON t.employee_id = e.id
-                        LEFT JOIN groups g ON t.group_id = g.id
-                        ORDER BY t.created_at DESC
-                    ''')
-                
-                columns = [desc[0] for desc in cur.description]
-                tasks = [dict(zip(columns, row)) for row in cur.fetchall()]
-                
-                for task in tasks:
-                    if task.get('created_at'):
-                        task['created_at'] = task['created_at'].isoformat()
-                    if task.get('completed_at'):
-                        task['completed_at'] = task['completed_at'].isoformat()
-                    if task.get('due_date'):
-                        task['due_date'] = task['due_date'].isoformat()
+            response_cache = get_cache()
+            with span('cache'):
+                body = response_cache.get(etag)
+            if body is None:
+                body = ''.join(LISTINGS[resource](conn, params))
+                with span('cache'):
+                    response_cache.put(etag, body)
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', **cache_headers},
+                'body': body
+            }
+        
+        elif method == 'POST':
+            body_data = json.loads(event.get('body', '{}'))
+            
+            if resource in BULK_SCHEMAS and isinstance(body_data, list):
+                return bulk_create(conn, cur, resource, body_data)
+            
+            elif resource == 'group_counters':
+                cur.execute('SELECT rebuild_group_counters()')
+                corrected = cur.fetchone()[0]
+                bump_versions(cur, ['groups'])
+                conn.commit()
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'tasks': tasks})
+                    'body': json.dumps({'success': True, 'corrected': corrected})
                 }
-        
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
             
-            if resource == 'employees':
-                cur.execute('''
-                    INSERT INTO employees (group_id, name, position, email, phone, status, hired_date)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                ''', (
+            elif resource == 'employees':
+                EMPLOYEE_INSERT.execute(cur, (
                     body_data.get('group_id'),
                     body_data['name'],
                     body_data.get('position'),
@@ -145,6 +428,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     body_data.get('hired_date')
                 ))
                 new_id = cur.fetchone()[0]
+                bump_versions(cur, write_scopes('employees', [body_data.get('group_id')]))
                 conn.commit()
                 
                 return {
@@ -154,11 +438,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             elif resource == 'tasks':
-                cur.execute('''
-                    INSERT INTO tasks (group_id, employee_id, title, description, status, priority, due_date)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                ''', (
+                TASK_INSERT.execute(cur, (
                     body_data.get('group_id'),
                     body_data.get('employee_id'),
                     body_data['title'],
@@ -168,6 +448,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     body_data.get('due_date')
                 ))
                 new_id = cur.fetchone()[0]
+                bump_versions(cur, write_scopes('tasks', [body_data.get('group_id')]))
                 conn.commit()
                 
                 return {
@@ -178,32 +459,17 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         elif method == 'PUT':
             body_data = json.loads(event.get('body', '{}'))
+            
+            if resource == 'tasks' and isinstance(body_data, list):
+                return batch_update_tasks(conn, cur, body_data)
+            
             item_id = body_data.get('id')
             
             if resource == 'tasks' and item_id:
-                update_fields = []
-                values = []
-                
-                if 'status' in body_data:
-                    update_fields.append('status = %s')
-                    values.append(body_data['status'])
-                    if body_data['status'] == 'completed':
-                        update_fields.append('completed_at = CURRENT_TIMESTAMP')
-                
-                if 'title' in body_data:
-                    update_fields.append('title = %s')
-                    values.append(body_data['title'])
-                
-                if 'employee_id' in body_data:
-                    update_fields.append('employee_id = %s')
-                    values.append(body_data['employee_id'])
-                
-                if update_fields:
-                    values.append(item_id)
-                    cur.execute(f'''
-                        UPDATE tasks SET {', '.join(update_fields)}
-                        WHERE id = %s
-                    ''', tuple(values))
+                values = update_values(TASK_UPDATE_FIELDS, body_data, item_id)
+                if values is not None:
+                    TASK_UPDATE.execute(cur, values)
+                    bump_versions(cur, write_scopes('tasks', [row[0] for row in cur.fetchall()]))
                     conn.commit()
                 
                 return {
@@ -213,20 +479,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             elif resource == 'employees' and item_id:
-                update_fields = []
-                values = []
-                
-                for field in ['name', 'position', 'email', 'phone', 'status']:
-                    if field in body_data:
-                        update_fields.append(f'{field} = %s')
-                        values.append(body_data[field])
-                
-                if update_fields:
-                    values.append(item_id)
-                    cur.execute(f'''
-                        UPDATE employees SET {', '.join(update_fields)}
-                        WHERE id = %s
-                    ''', tuple(values))
+                values = update_values(EMPLOYEE_UPDATE_FIELDS, body_data, item_id)
+                if values is not None:
+                    EMPLOYEE_UPDATE.execute(cur, values)
+                    bump_versions(cur, write_scopes('employees', [row[0] for row in cur.fetchall()]))
                     conn.commit()
                 
                 return {
@@ -241,6 +497,20 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Invalid request'})
         }
     
+    except InvalidPageRequest as e:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e)})
+        }
+    
+    except SyncTokenExpired as e:
+        return {
+            'statusCode': 410,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e)})
+        }
+    
     finally:
         cur.close()
-        conn.close()
+        pool.putconn(conn)
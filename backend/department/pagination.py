@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+from typing import Dict, Any, List, Optional
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class InvalidPageRequest(ValueError):
+    '''Raised for malformed limit or cursor query parameters'''
+
+
+def parse_limit(params: Dict[str, Any], default: int = DEFAULT_LIMIT, maximum: int = MAX_LIMIT) -> int:
+    '''Read ?limit=, falling back to default and clamping to maximum'''
+    raw = params.get('limit')
+    if raw in (None, ''):
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest('limit must be an integer')
+    if limit < 1:
+        raise InvalidPageRequest('limit must be positive')
+    return min(limit, maximum)
+
+
+def encode_cursor(resource: str, key: List[Any]) -> str:
+    '''Opaque continuation token holding the sort key of the last returned row'''
+    raw = json.dumps({'r': resource, 'k': key}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str], resource: str, size: int = 2) -> Optional[List[Any]]:
+    '''Sort key of a token issued by encode_cursor for the same resource, the id is at position 1'''
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        key = data['k']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidPageRequest('Invalid cursor')
+    if (data.get('r') != resource or not isinstance(key, list) or len(key) != size
+            or not isinstance(key[1], int) or isinstance(key[1], bool)):
+        raise InvalidPageRequest('Invalid cursor')
+    return key
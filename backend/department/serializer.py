@@ -0,0 +1,87 @@
+import json
+import uuid
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from timing import span
+
+# Postgres type OIDs from cur.description
+DATE_TYPES = {1082, 1083, 1114, 1184, 1266}  # date, time, timestamp, timestamptz, timetz
+INT_TYPES = {20, 21, 23}  # int8, int2, int4
+TEXT_TYPES = {25, 1042, 1043}  # text, bpchar, varchar
+
+ITERSIZE = 1000
+
+
+def _encode_date(value: Any) -> str:
+    return '"' + value.isoformat() + '"'
+
+
+def column_encoders(description: Any) -> List[Tuple[str, Callable[[Any], str]]]:
+    '''Pick a JSON encoder per column once, from the type OIDs in cur.description'''
+    encoders = []
+    for column in description:
+        if column.type_code in DATE_TYPES:
+            encode = _encode_date
+        elif column.type_code in INT_TYPES:
+            encode = int.__repr__
+        elif column.type_code in TEXT_TYPES:
+            encode = encode_basestring_ascii
+        else:
+            encode = json.dumps
+        encoders.append((encode_basestring_ascii(column.name) + ': ', encode))
+    return encoders
+
+
+def encode_row(encoders: List[Tuple[str, Callable[[Any], str]]], row: tuple) -> str:
+    return '{' + ', '.join(
+        prefix + ('null' if value is None else encode(value))
+        for (prefix, encode), value in zip(encoders, row)
+    ) + '}'
+
+
+class ArrayWriter:
+    '''
+    Encodes rows from one or more cursors as the items of a JSON array,
+    one chunk per fetched batch, stopping after `limit` rows. Keeps the
+    last emitted row so callers can build a continuation cursor from it.
+    '''
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.written = 0
+        self.has_more = False
+        self.last: Optional[tuple] = None
+        self.columns: List[str] = []
+
+    def write(self, cur: Any) -> Iterator[str]:
+        encoders = None
+        while not self.has_more:
+            with span('db.fetch'):
+                rows = cur.fetchmany(cur.itersize)
+            if not rows:
+                return
+            if encoders is None:
+                encoders = column_encoders(cur.description)
+                self.columns = [column.name for column in cur.description]
+            if self.limit is not None and self.written + len(rows) > self.limit:
+                rows = rows[:self.limit - self.written]
+                self.has_more = True
+                if not rows:
+                    return
+            with span('serialize'):
+                chunk = ', '.join(encode_row(encoders, row) for row in rows)
+            yield (', ' + chunk) if self.written else chunk
+            self.written += len(rows)
+            self.last = rows[-1]
+
+    def last_value(self, column: str) -> Any:
+        return self.last[self.columns.index(column)]
+
+
+def open_cursor(conn: Any, query: str, values: tuple = (), server_side: bool = False) -> Any:
+    '''Execute on a named (server-side) cursor when the result is unbounded'''
+    cur = conn.cursor(name=f'stream_{uuid.uuid4().hex}') if server_side else conn.cursor()
+    cur.itersize = ITERSIZE
+    cur.execute(query, values)
+    return cur
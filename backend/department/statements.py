@@ -0,0 +1,113 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, Sequence
+from weakref import WeakKeyDictionary
+
+from timing import current_timer
+
+# Set to false behind a transaction-mode pooler, where session-level PREPARE does not survive between transactions
+PREPARED_STATEMENTS = os.environ.get('PREPARED_STATEMENTS', 'true').lower() != 'false'
+
+PARAM = re.compile(r'\$(\d+)')
+
+_registry: Dict[str, 'Statement'] = {}
+_prepared: 'WeakKeyDictionary[Any, set]' = WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class Statement:
+    '''
+    Hot SQL with $n placeholders, registered under a fixed name. The first
+    execution on a connection runs PREPARE, later ones only EXECUTE, so
+    Postgres parses the text once per session and can reuse a cached plan.
+    PREPARE only parses and analyzes, planning happens on EXECUTE; its time
+    is known only for executions sampled by EXPLAIN_SAMPLE_RATE.
+    '''
+
+    def __init__(self, name: str, sql: str):
+        if name in _registry:
+            raise ValueError(f'Statement {name} is already registered')
+        self.name = name
+        self.sql = ' '.join(sql.split())
+        self.params = max((int(number) for number in PARAM.findall(self.sql)), default=0)
+        arguments = f" ({', '.join(['%s'] * self.params)})" if self.params else ''
+        self.execute_sql = f'EXECUTE {name}{arguments}'
+        # Same text with pyformat placeholders for PREPARED_STATEMENTS=false, $n may repeat
+        self.plain_sql = PARAM.sub(lambda match: f'%(p{match.group(1)})s', self.sql.replace('%', '%%'))
+        self.prepares = 0
+        self.prepare_ms = 0.0
+        self.executions = 0
+        self.execute_ms = 0.0
+        self.plan_samples = 0
+        self.plan_ms = 0.0
+        _registry[name] = self
+
+    def execute(self, cur: Any, values: Sequence[Any] = ()) -> Any:
+        '''Run on cur, preparing on its connection first when needed, and return cur'''
+        if len(values) != self.params:
+            raise ValueError(f'{self.name} takes {self.params} parameters, got {len(values)}')
+        timer = current_timer()
+        sampled = len(timer.plans) if timer is not None else 0
+        if not PREPARED_STATEMENTS:
+            started = time.perf_counter()
+            cur.execute(self.plain_sql, {f'p{index}': value for index, value in enumerate(values, 1)})
+            self._count_execution(time.perf_counter() - started, timer, sampled)
+            return cur
+
+        prepared = _prepared.setdefault(cur.connection, set())
+        if self.name not in prepared:
+            started = time.perf_counter()
+            cur.execute(f'PREPARE {self.name} AS {self.sql}')
+            elapsed = time.perf_counter() - started
+            prepared.add(self.name)
+            with _lock:
+                self.prepares += 1
+                self.prepare_ms += elapsed * 1000
+
+        started = time.perf_counter()
+        cur.execute(self.execute_sql, tuple(values))
+        self._count_execution(time.perf_counter() - started, timer, sampled)
+        return cur
+
+    def open(self, conn: Any, values: Sequence[Any] = ()) -> Any:
+        '''Client-side cursor holding the result, for ArrayWriter'''
+        return self.execute(conn.cursor(), values)
+
+    def _count_execution(self, seconds: float, timer: Any, sampled: int) -> None:
+        # TimedCursor appends an EXPLAIN ANALYZE sample of this execution when the request is sampled
+        planning_ms = timer.plans[-1].get('planning_ms') if timer is not None and len(timer.plans) > sampled else None
+        with _lock:
+            self.executions += 1
+            self.execute_ms += seconds * 1000
+            if planning_ms is not None:
+                self.plan_samples += 1
+                self.plan_ms += planning_ms
+
+
+def statement_stats() -> Dict[str, Dict[str, Any]]:
+    '''
+    Per statement since the container started: PREPARE count and parse/analyze
+    time, EXECUTE count and time, and planning time of the EXPLAIN-sampled executions
+    '''
+    with _lock:
+        return {
+            name: {
+                'prepares': statement.prepares,
+                'prepare_ms': round(statement.prepare_ms, 2),
+                'executions': statement.executions,
+                'execute_ms': round(statement.execute_ms, 2),
+                'plan_samples': statement.plan_samples,
+                'plan_ms': round(statement.plan_ms, 3),
+            }
+            for name, statement in _registry.items()
+        }
+
+
+def plan_counts(cur: Any) -> Dict[str, Dict[str, int]]:
+    '''Generic and custom plans Postgres built for each statement prepared in this session'''
+    cur.execute('SELECT name, generic_plans, custom_plans FROM pg_prepared_statements WHERE name = ANY(%s)',
+                (list(_registry),))
+    return {name: {'generic_plans': generic, 'custom_plans': custom} for name, generic, custom in cur.fetchall()}
+
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+from typing import Dict, Any, Iterator, List
+
+from timing import span
+
+# Overdue counts move with the calendar, so cached stats are also keyed by a time window
+STATS_TTL = int(os.environ.get('STATS_TTL', '30'))
+
+STATUSES = ('todo', 'in_progress', 'completed')
+PRIORITIES = ('low', 'medium', 'high')
+
+LEAD_TIME = 'EXTRACT(EPOCH FROM t.completed_at - t.created_at)'
+LEAD_FILTER = "t.status = 'completed' AND t.completed_at IS NOT NULL"
+
+# One pass over tasks: totals, per group and per employee through GROUPING SETS,
+# every breakdown as a FILTER aggregate of the same scan. Only hashable aggregates,
+# an ordered-set aggregate such as a median would force sorting the whole scan.
+STATS_SELECT = f'''
+    SELECT GROUPING(t.group_id) AS by_group, GROUPING(t.employee_id) AS by_employee,
+           t.group_id, t.employee_id,
+           COUNT(*) AS total,
+           {', '.join(f"COUNT(*) FILTER (WHERE t.status = '{status}') AS {status}" for status in STATUSES)},
+           {', '.join(f"COUNT(*) FILTER (WHERE t.priority = '{priority}') AS {priority}" for priority in PRIORITIES)},
+           COUNT(*) FILTER (WHERE t.due_date < CURRENT_DATE AND t.status <> 'completed') AS overdue,
+           COUNT(*) FILTER (WHERE {LEAD_FILTER}) AS lead_count,
+           AVG({LEAD_TIME}) FILTER (WHERE {LEAD_FILTER}) AS lead_avg,
+           MAX({LEAD_TIME}) FILTER (WHERE {LEAD_FILTER}) AS lead_max
+    FROM tasks t
+'''
+
+
+def stats_window() -> int:
+    '''Current TTL window, part of the cache key so memoized stats expire'''
+    return int(time.time()) // STATS_TTL
+
+
+def stats_entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'total': row['total'],
+        'by_status': {status: row[status] for status in STATUSES},
+        'by_priority': {priority: row[priority] for priority in PRIORITIES},
+        'overdue': row['overdue'],
+        'lead_time': {
+            'completed': row['lead_count'],
+            'avg_seconds': round(float(row['lead_avg']), 1) if row['lead_avg'] is not None else None,
+            'max_seconds': round(float(row['lead_max']), 1) if row['lead_max'] is not None else None,
+        },
+    }
+
+
+def task_stats(conn: Any, params: Dict[str, Any]) -> Iterator[str]:
+    '''Task breakdowns for the whole department, or one group or employee with ?group_id= / ?employee_id='''
+    conditions = []
+    values: List[Any] = []
+    for name in ('group_id', 'employee_id'):
+        if params.get(name):
+            conditions.append(f't.{name} = %s')
+            values.append(params[name])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    with conn.cursor() as cur:
+        cur.execute(f'''
+            {STATS_SELECT}
+            {where}
+            GROUP BY GROUPING SETS ((), (t.group_id), (t.employee_id))
+        ''', tuple(values))
+        with span('db.fetch'):
+            columns = [column.name for column in cur.description]
+            rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    with span('serialize'):
+        totals = None
+        groups: List[Dict[str, Any]] = []
+        employees: List[Dict[str, Any]] = []
+        for row in rows:
+            if row['by_group'] and row['by_employee']:
+                totals = stats_entry(row)
+            elif not row['by_group']:
+                groups.append({'group_id': row['group_id'], **stats_entry(row)})
+            else:
+                employees.append({'employee_id': row['employee_id'], **stats_entry(row)})
+        groups.sort(key=lambda item: (item['group_id'] is None, item['group_id'] or 0))
+        employees.sort(key=lambda item: (item['employee_id'] is None, item['employee_id'] or 0))
+        yield json.dumps({'totals': totals, 'groups': groups, 'employees': employees}, ensure_ascii=False)
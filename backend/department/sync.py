@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from pagination import InvalidPageRequest, decode_cursor, encode_cursor
+
+# Tombstones are pruned after this long by record_sync_tombstone(), see V0007
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class SyncTokenExpired(Exception):
+    '''The since token predates the tombstone retention window, the client needs a full resync'''
+
+
+class SyncState:
+    '''
+    Position of a delta-sync client, carried in the opaque since token as
+    [since, after_id, floor]. A cycle starts at (since, 0) and pages through
+    rows ordered by (updated_at, id). floor is the lowest sync_watermark()
+    seen during the cycle and becomes the since of the next cycle, so rows
+    written by transactions that were still open while paging are picked up
+    again rather than skipped.
+    '''
+
+    def __init__(self, since: Optional[datetime], after_id: int, floor: datetime):
+        self.since = since
+        self.after_id = after_id
+        self.floor = floor
+
+    @property
+    def cycle_start(self) -> bool:
+        return self.after_id == 0
+
+    def next_token(self, scope: str, last: Optional[Tuple[datetime, int]]) -> str:
+        '''Token for the next page when last is given, otherwise for the next cycle'''
+        floor = self.floor.isoformat()
+        if last is not None:
+            return encode_cursor(scope, [last[0].isoformat(), last[1], floor])
+        return encode_cursor(scope, [floor, 0, floor])
+
+
+def sync_scope(resource: str, group_id: Optional[str]) -> str:
+    '''Tokens are bound to the resource and group filter they were issued for'''
+    return f"sync:{resource}:{group_id or ''}"
+
+
+def read_state(cur: Any, scope: str, token: Optional[str]) -> SyncState:
+    '''Decode the since token against the current watermark, an empty token starts a full sync'''
+    key = decode_cursor(token or None, scope, size=3)
+    cur.execute('SELECT sync_watermark()')
+    watermark = cur.fetchone()[0]
+    if key is None:
+        return SyncState(None, 0, watermark)
+
+    try:
+        since = datetime.fromisoformat(key[0])
+        floor = datetime.fromisoformat(key[2])
+    except (TypeError, ValueError):
+        raise InvalidPageRequest('Invalid cursor')
+    # Only a cycle's first page reads tombstones. Later pages carry the updated_at of the last
+    # row sent, which can be far older than the retention during a full sync of untouched rows
+    if key[1] == 0 and since < watermark - TOMBSTONE_RETENTION:
+        raise SyncTokenExpired('since token has expired, run a full sync')
+    return SyncState(since, key[1], watermark if key[1] == 0 else min(floor, watermark))
+
+
+def deleted_ids(cur: Any, resource: str, group_id: Optional[str], since: datetime) -> List[int]:
+    '''
+    Ids tombstoned since the start of the cycle that are no longer in the
+    client's scope. Rows moved out of the filtered group count as deleted,
+    rows moved back in come through as changes instead.
+    '''
+    group_filter = 'AND s.group_id = %s' if group_id else ''
+    present_filter = 'AND x.group_id = %s' if group_id else ''
+    values: List[Any] = [resource, since]
+    if group_id:
+        values.extend([group_id, group_id])
+    cur.execute(f'''
+        SELECT DISTINCT s.row_id
+        FROM sync_tombstones s
+        WHERE s.resource = %s AND s.deleted_at >= %s {group_filter}
+          AND NOT EXISTS (SELECT 1 FROM {resource} x WHERE x.id = s.row_id {present_filter})
+        ORDER BY s.row_id
+    ''', tuple(values))
+    return [row_id for (row_id,) in cur.fetchall()]
+
+
+def changes_filter(alias: str, group_id: Optional[str], state: SyncState, limit: int) -> Tuple[str, tuple]:
+    '''WHERE/ORDER/LIMIT for the next page of changed rows, served by the (group_id, updated_at, id) indexes'''
+    conditions = []
+    values: List[Any] = []
+    if group_id:
+        conditions.append(f'{alias}.group_id = %s')
+        values.append(group_id)
+    if state.since is not None:
+        conditions.append(f'({alias}.updated_at, {alias}.id) > (%s, %s)')
+        values.extend([state.since, state.after_id])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    values.append(limit + 1)
+    return f'''
+        {where}
+        ORDER BY {alias}.updated_at, {alias}.id
+        LIMIT %s
+    ''', tuple(values)
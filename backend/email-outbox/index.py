@@ -0,0 +1,157 @@
+import json
+import os
+from typing import Dict, Any, Tuple
+
+from timing import instrumented, span
+
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '20'))
+MAX_BATCHES = int(os.environ.get('OUTBOX_MAX_BATCHES', '10'))
+MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5'))
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 3600
+
+def backoff_seconds(attempts: int) -> int:
+    '''Exponential delay before the next attempt after `attempts` failures'''
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+def _mark_sent(cur: Any, outbox_id: int) -> None:
+    cur.execute('''
+        UPDATE email_outbox
+        SET status = 'sent', attempts = attempts + 1, sent_at = CURRENT_TIMESTAMP, last_error = NULL
+        WHERE id = %s
+    ''', (outbox_id,))
+
+def _mark_failed(cur: Any, outbox_id: int, attempts: int, error: str) -> bool:
+    '''Record a failed attempt, returns True when the row will be retried'''
+    attempts += 1
+    retry = attempts < MAX_ATTEMPTS
+    cur.execute('''
+        UPDATE email_outbox
+        SET status = %s,
+            attempts = %s,
+            last_error = %s,
+            next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        WHERE id = %s
+    ''', ('pending' if retry else 'failed', attempts, error[:1000], backoff_seconds(attempts), outbox_id))
+    return retry
+
+def smtp_settings() -> Tuple[str, int, str, str, bool]:
+    return (
+        os.environ.get('SMTP_HOST'),
+        int(os.environ.get('SMTP_PORT', '587')),
+        os.environ.get('SMTP_USER'),
+        os.environ.get('SMTP_PASSWORD'),
+        os.environ.get('SMTP_STARTTLS', 'true').lower() != 'false',
+    )
+
+def drain_batch(batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    '''
+    Claim due rows with FOR UPDATE SKIP LOCKED and send them over one SMTP
+    session. Row locks are held until the batch commits, so concurrent
+    drains never pick the same email.
+    '''
+    import smtplib
+    from db import get_pool
+    from email_templates import render_confirmation
+
+    stats = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    smtp_host, smtp_port, smtp_user, smtp_password, starttls = smtp_settings()
+
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute('''
+                SELECT id, application_type, recipient, name, surname, attempts
+                FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ''', (batch_size,))
+            rows = cur.fetchall()
+            stats['claimed'] = len(rows)
+            if not rows:
+                return stats
+
+            server = None
+            try:
+                with span('smtp.connect'):
+                    server = smtplib.SMTP(smtp_host, smtp_port, timeout=30)
+                    if starttls:
+                        server.starttls()
+                    server.login(smtp_user, smtp_password)
+            except (smtplib.SMTPException, OSError) as e:
+                if server is not None:
+                    server.close()
+                for outbox_id, _, _, _, _, attempts in rows:
+                    stats['retried' if _mark_failed(cur, outbox_id, attempts, str(e)) else 'failed'] += 1
+                conn.commit()
+                return stats
+
+            with server:
+                for outbox_id, application_type, recipient, name, surname, attempts in rows:
+                    try:
+                        with span('render'):
+                            message = render_confirmation(application_type, name, surname, recipient, smtp_user)
+                        with span('smtp.send'):
+                            server.sendmail(smtp_user, [recipient], message)
+                        _mark_sent(cur, outbox_id)
+                        stats['sent'] += 1
+                    except (smtplib.SMTPException, OSError) as e:
+                        stats['retried' if _mark_failed(cur, outbox_id, attempts, str(e)) else 'failed'] += 1
+            conn.commit()
+
+    return stats
+
+def drain_options(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''batch_size/max_batches from a timer payload or, when called over HTTP, from the JSON body'''
+    if 'httpMethod' in event:
+        try:
+            body = json.loads(event.get('body') or '{}')
+        except ValueError:
+            body = {}
+        return body if isinstance(body, dict) else {}
+    return event
+
+@instrumented
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Drain the confirmation email outbox filled by submit-application, run by a timer trigger
+    Args: event - timer payload or HTTP request, optional batch_size and max_batches
+          context with request_id
+    Returns: counts of claimed, sent, retried and failed emails
+    '''
+    smtp_host, _, smtp_user, smtp_password, _ = smtp_settings()
+    if not all([smtp_host, smtp_user, smtp_password]):
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'SMTP configuration missing'}),
+            'isBase64Encoded': False
+        }
+
+    options = drain_options(event)
+    try:
+        batch_size = max(1, int(options.get('batch_size') or BATCH_SIZE))
+        max_batches = max(1, int(options.get('max_batches') or MAX_BATCHES))
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'batch_size and max_batches must be integers'}),
+            'isBase64Encoded': False
+        }
+    totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+    for _ in range(max_batches):
+        stats = drain_batch(batch_size)
+        for key, value in stats.items():
+            totals[key] += value
+        if stats['claimed'] < batch_size:
+            break
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(totals),
+        'isBase64Encoded': False
+    }
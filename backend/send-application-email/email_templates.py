@@ -0,0 +1,98 @@
+import base64
+import html
+import uuid
+from email.header import Header
+from functools import lru_cache
+from typing import Dict
+
+SUBJECT = 'Ваша анкета получена'
+
+TEXT_TEMPLATE = '''Добрый день, {name} {surname},
+
+{intro}
+
+С уважением,
+Отдел кадров'''
+
+HTML_TEMPLATE = '''
+    <html>
+      <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+          <h2 style="color: #0EA5E9;">{heading}</h2>
+          <p>Добрый день, <strong>{name} {surname}</strong>,</p>
+          <p>{intro}</p>
+          <br>
+          <p style="color: #666;">С уважением,<br>Отдел кадров</p>
+        </div>
+      </body>
+    </html>
+    '''
+
+# Static wording per application_type, filled into the templates once per container
+VARIANTS: Dict[str, Dict[str, str]] = {
+    'applicant': {
+        'heading': 'Ваша анкета получена',
+        'intro': 'Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.',
+    },
+    'student': {
+        'heading': 'Ваша анкета на стажировку получена',
+        'intro': 'Ваша анкета на стажировку получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.',
+    },
+}
+
+
+class ConfirmationTemplate:
+    '''
+    Confirmation email with everything except the recipient fields prepared
+    up front: encoded Subject, multipart skeleton and per-part headers. Each
+    render only formats name/surname into the bodies and base64-encodes them.
+    '''
+
+    def __init__(self, application_type: str):
+        variant = VARIANTS[application_type]
+        self.text = TEXT_TEMPLATE.replace('{intro}', variant['intro'])
+        self.html = HTML_TEMPLATE.replace('{heading}', html.escape(variant['heading'])).replace('{intro}', html.escape(variant['intro']))
+        boundary = f'=_{uuid.uuid4().hex}'
+        subject = Header(SUBJECT, 'utf-8').encode()
+        self.head = (
+            f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'
+            f'MIME-Version: 1.0\r\n'
+            f'Subject: {subject}\r\n'
+        ).encode('ascii')
+        part = 'Content-Type: text/{}; charset="utf-8"\r\nMIME-Version: 1.0\r\nContent-Transfer-Encoding: base64\r\n\r\n'
+        self.text_open = f'\r\n--{boundary}\r\n{part.format("plain")}'.encode('ascii')
+        self.html_open = f'\r\n--{boundary}\r\n{part.format("html")}'.encode('ascii')
+        self.close = f'\r\n--{boundary}--\r\n'.encode('ascii')
+
+    def render(self, name: str, surname: str, email: str, sender: str) -> bytes:
+        '''Full RFC 5322 message ready for SMTP sendmail'''
+        text_body = self.text.format(name=name, surname=surname)
+        html_body = self.html.format(name=html.escape(name), surname=html.escape(surname))
+        return b''.join((
+            self.head,
+            b'From: ', _address(sender), b'\r\n',
+            b'To: ', _address(email), b'\r\n',
+            self.text_open, _base64_lines(text_body),
+            self.html_open, _base64_lines(html_body),
+            self.close,
+        ))
+
+
+def _base64_lines(body: str) -> bytes:
+    return base64.encodebytes(body.encode('utf-8')).replace(b'\n', b'\r\n')
+
+
+def _address(address: str) -> bytes:
+    if address.isascii():
+        return address.replace('\r', '').replace('\n', '').encode('ascii')
+    return Header(address, 'utf-8').encode().encode('ascii')
+
+
+@lru_cache(maxsize=None)
+def get_template(application_type: str) -> ConfirmationTemplate:
+    '''Templates are compiled on first use and kept for the life of the container'''
+    return ConfirmationTemplate(application_type)
+
+
+def render_confirmation(application_type: str, name: str, surname: str, email: str, sender: str) -> bytes:
+    return get_template(application_type).render(name, surname, email, sender)
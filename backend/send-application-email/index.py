@@ -1,17 +1,42 @@
 import json
-import smtplib
-import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any
-from pydantic import BaseModel, EmailStr, Field
+from typing import TYPE_CHECKING, Dict, Any, List
 
-class ApplicationEmail(BaseModel):
-    name: str = Field(..., min_length=1)
-    surname: str = Field(..., min_length=1)
-    email: EmailStr
-    application_type: str = Field(..., pattern='^(student|applicant)$')
+if TYPE_CHECKING:
+    from models import ApplicationEmail
 
+from timing import instrumented, span
+
+MAX_BATCH_RECIPIENTS = 100
+
+def render_message(app_email: 'ApplicationEmail', sender: str) -> bytes:
+    from email_templates import render_confirmation
+    with span('render'):
+        return render_confirmation(app_email.application_type, app_email.name, app_email.surname, app_email.email, sender)
+
+def send_batch(items: List[Any], sender: str) -> List[Dict[str, Any]]:
+    '''Send every recipient over the shared SMTP session, one result per recipient'''
+    import smtplib
+    from decoding import InvalidRequest, validate_item
+    from models import EMAIL_VALIDATOR
+    from smtp_session import get_session
+    
+    session = get_session()
+    results = []
+    for index, item in enumerate(items):
+        try:
+            with span('validate'):
+                app_email = validate_item(EMAIL_VALIDATOR, item)
+        except InvalidRequest as e:
+            results.append({'index': index, 'success': False, 'error': str(e)})
+            continue
+        try:
+            session.send(sender, app_email.email, render_message(app_email, sender))
+            results.append({'index': index, 'email': app_email.email, 'success': True})
+        except (smtplib.SMTPException, OSError) as e:
+            results.append({'index': index, 'email': app_email.email, 'success': False, 'error': str(e)})
+    return results
+
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Send confirmation email to job applicants
@@ -44,13 +69,28 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    body_data = json.loads(event.get('body', '{}'))
-    app_email = ApplicationEmail(**body_data)
+    import smtplib
+    from decoding import InvalidRequest, decode_body, is_array, raw_body
+    from models import BATCH_VALIDATOR, EMAIL_VALIDATOR
+    from smtp_session import get_session, smtp_settings
     
-    smtp_host = os.environ.get('SMTP_HOST')
-    smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-    smtp_user = os.environ.get('SMTP_USER')
-    smtp_password = os.environ.get('SMTP_PASSWORD')
+    raw = raw_body(event)
+    batch = is_array(raw)
+    try:
+        with span('validate'):
+            body_data = decode_body(BATCH_VALIDATOR if batch else EMAIL_VALIDATOR, raw)
+    except InvalidRequest as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e), 'errors': e.errors}),
+            'isBase64Encoded': False
+        }
+    
+    smtp_host, _, smtp_user, smtp_password, _ = smtp_settings()
     
     if not all([smtp_host, smtp_user, smtp_password]):
         return {
@@ -63,42 +103,47 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = 'Ваша анкета получена'
-    msg['From'] = smtp_user
-    msg['To'] = app_email.email
-    
-    text_content = f'''Добрый день, {app_email.name} {app_email.surname},
-
-Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.
-
-С уважением,
-Отдел кадров'''
-    
-    html_content = f'''
-    <html>
-      <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-          <h2 style="color: #0EA5E9;">Ваша анкета получена</h2>
-          <p>Добрый день, <strong>{app_email.name} {app_email.surname}</strong>,</p>
-          <p>Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.</p>
-          <br>
-          <p style="color: #666;">С уважением,<br>Отдел кадров</p>
-        </div>
-      </body>
-    </html>
-    '''
-    
-    part1 = MIMEText(text_content, 'plain', 'utf-8')
-    part2 = MIMEText(html_content, 'html', 'utf-8')
+    if batch:
+        if not body_data or len(body_data) > MAX_BATCH_RECIPIENTS:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': f'Batch must contain 1 to {MAX_BATCH_RECIPIENTS} recipients'}),
+                'isBase64Encoded': False
+            }
+        
+        results = send_batch(body_data, smtp_user)
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': all(result['success'] for result in results),
+                'sent': sum(1 for result in results if result['success']),
+                'results': results
+            }),
+            'isBase64Encoded': False
+        }
     
-    msg.attach(part1)
-    msg.attach(part2)
+    app_email = body_data
     
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+    try:
+        get_session().send(smtp_user, app_email.email, render_message(app_email, smtp_user))
+    except (smtplib.SMTPException, OSError) as e:
+        return {
+            'statusCode': 502,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': f'SMTP error: {e}'}),
+            'isBase64Encoded': False
+        }
     
     return {
         'statusCode': 200,
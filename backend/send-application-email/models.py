@@ -0,0 +1,15 @@
+from typing import Any, List
+
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter
+
+
+class ApplicationEmail(BaseModel):
+    name: str = Field(..., min_length=1)
+    surname: str = Field(..., min_length=1)
+    email: EmailStr
+    application_type: str = Field(..., pattern='^(student|applicant)$')
+
+
+# Built once per container on first import
+EMAIL_VALIDATOR = TypeAdapter(ApplicationEmail)
+BATCH_VALIDATOR = TypeAdapter(List[Any])
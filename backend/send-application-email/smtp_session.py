@@ -0,0 +1,115 @@
+import os
+import smtplib
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from timing import span
+
+
+class SMTPSession:
+    '''
+    Authenticated SMTP connection kept at module level so warm invocations
+    skip the connect, STARTTLS and login round trips. A NOOP probes the
+    connection after it has been idle, and a dropped session is reopened once.
+    '''
+
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 starttls: bool = True, timeout: float = 30.0, check_after: float = 10.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.check_after = check_after
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'connects': 0, 'reuses': 0, 'reconnects': 0, 'sent': 0}
+
+    def _connect(self) -> smtplib.SMTP:
+        with span('smtp.connect'):
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls()
+                server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+        self.stats['connects'] += 1
+        return server
+
+    def _is_alive(self) -> bool:
+        if time.monotonic() - self._last_used < self.check_after:
+            return True
+        try:
+            with span('smtp.ping'):
+                return self._server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _ensure(self) -> smtplib.SMTP:
+        if self._server is not None and self._is_alive():
+            self.stats['reuses'] += 1
+            return self._server
+        if self._server is not None:
+            self._drop()
+            self.stats['reconnects'] += 1
+        self._server = self._connect()
+        return self._server
+
+    def _drop(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def send(self, sender: str, recipient: str, message: bytes) -> None:
+        '''Send a rendered message over the shared connection, reconnecting once if the server hung up'''
+        with self._lock:
+            try:
+                server = self._ensure()
+                with span('smtp.send'):
+                    server.sendmail(sender, [recipient], message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._drop()
+                self.stats['reconnects'] += 1
+                self._server = self._connect()
+                with span('smtp.send'):
+                    self._server.sendmail(sender, [recipient], message)
+            self._last_used = time.monotonic()
+            self.stats['sent'] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+
+def smtp_settings() -> Tuple[Optional[str], int, Optional[str], Optional[str], bool]:
+    return (
+        os.environ.get('SMTP_HOST'),
+        int(os.environ.get('SMTP_PORT', '587')),
+        os.environ.get('SMTP_USER'),
+        os.environ.get('SMTP_PASSWORD'),
+        os.environ.get('SMTP_STARTTLS', 'true').lower() != 'false',
+    )
+
+
+_sessions: Dict[Tuple[Any, ...], SMTPSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session() -> SMTPSession:
+    '''Module-level session per SMTP configuration, survives across warm invocations'''
+    settings = smtp_settings()
+    with _sessions_lock:
+        session = _sessions.get(settings)
+        if session is None:
+            host, port, user, password, starttls = settings
+            session = SMTPSession(host, port, user, password, starttls=starttls)
+            _sessions[settings] = session
+        return session
@@ -0,0 +1,49 @@
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+# Sustained submissions per second admitted by one warm container and the burst it absorbs, 0 disables
+ADMISSION_RATE = float(os.environ.get('ADMISSION_RATE', '20'))
+ADMISSION_BURST = float(os.environ.get('ADMISSION_BURST', '40'))
+
+
+class TokenBucket:
+    '''
+    Classic token bucket: refills at `rate` tokens per second up to
+    `burst`, each admitted request takes one token.
+    '''
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.admitted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        '''0 when admitted, otherwise whole seconds to wait for the next token'''
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.admitted += 1
+                return 0
+            self.rejected += 1
+            return max(1, math.ceil((1 - self.tokens) / self.rate))
+
+
+_bucket: Optional[TokenBucket] = None
+
+
+def get_bucket() -> Optional[TokenBucket]:
+    '''Module-level bucket shared by warm invocations, None when admission control is off'''
+    global _bucket
+    if _bucket is None and ADMISSION_RATE > 0:
+        _bucket = TokenBucket(ADMISSION_RATE, ADMISSION_BURST)
+    return _bucket
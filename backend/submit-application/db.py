@@ -0,0 +1,371 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+from timing import current_timer, span
+
+# Statements that EXPLAIN accepts, EXECUTE covers prepared statements
+EXPLAINABLE = (b'SELECT', b'WITH', b'INSERT', b'UPDATE', b'DELETE', b'VALUES', b'EXECUTE')
+
+
+def explain_plan(conn: Any, statement: bytes) -> Dict[str, Any]:
+    '''
+    Run one statement under EXPLAIN (ANALYZE, BUFFERS) inside a savepoint that
+    is rolled back, so sampled writes do not take effect twice.
+    '''
+    text = ' '.join(statement.decode('utf-8', 'replace').split())
+    sample: Dict[str, Any] = {'query': text[:300]}
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        cur.execute('SAVEPOINT explain_sample')
+        try:
+            cur.execute(b'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + statement)
+            plan = cur.fetchone()[0][0]
+            sample.update({
+                'planning_ms': plan.get('Planning Time'),
+                'execution_ms': plan.get('Execution Time'),
+                'node': plan['Plan'].get('Node Type'),
+                'rows': plan['Plan'].get('Actual Rows'),
+                'shared_hit': plan['Plan'].get('Shared Hit Blocks'),
+                'shared_read': plan['Plan'].get('Shared Read Blocks'),
+            })
+        except psycopg2.Error as e:
+            sample['error'] = str(e).strip()
+        cur.execute('ROLLBACK TO SAVEPOINT explain_sample')
+    return sample
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    '''Pooled connection that knows which target (db or replica) its spans belong to'''
+
+    target = 'db'
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    '''Default cursor of pooled connections: times execute as <target>.query and samples plans when asked'''
+
+    def execute(self, query: Any, vars: Any = None) -> None:
+        timer = current_timer()
+        if timer is not None and timer.explain and not self.connection.autocommit:
+            statement = self.mogrify(query, vars)
+            if statement.lstrip()[:7].upper().startswith(EXPLAINABLE):
+                timer.plans.append(explain_plan(self.connection, statement))
+        with span(f'{self.connection.target}.query'):
+            return super().execute(query, vars)
+
+
+class PoolTimeout(Exception):
+    '''Raised when no connection became free within the wait timeout'''
+
+
+class ConnectionPool:
+    '''
+    Thread-safe pool of psycopg2 connections kept at module level so that
+    warm invocations of the function reuse already authenticated sessions.
+    '''
+
+    def __init__(self, dsn: str, max_size: int = 4, timeout: float = 5.0, check_after: float = 30.0,
+                 target: str = 'db', connect_timeout: Optional[float] = None):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.target = target
+        self.connect_timeout = connect_timeout
+        self._idle: List[Any] = []
+        self._last_used: Dict[int, float] = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'timeouts': 0, 'discarded': 0}
+
+    def _connect(self) -> Any:
+        options: Dict[str, Any] = {}
+        if self.connect_timeout is not None:
+            options['connect_timeout'] = max(1, round(self.connect_timeout))
+        with span(f'{self.target}.connect'):
+            conn = psycopg2.connect(self.dsn, connection_factory=TimedConnection, cursor_factory=TimedCursor, **options)
+        conn.target = self.target
+        self._last_used[id(conn)] = time.monotonic()
+        return conn
+
+    def _is_alive(self, conn: Any) -> bool:
+        '''Cheap liveness check, pings the server only after a long idle period'''
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0.0) < self.check_after:
+            return True
+        try:
+            with span(f'{self.target}.ping'), conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        self._last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def getconn(self) -> Any:
+        '''Take an idle live connection or open a new one while under max_size'''
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'No free connection after {self.timeout}s')
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                    with span(f'{self.target}.wait'):
+                        self._cond.wait(remaining)
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    self._size += 1
+                    self._stats['misses'] += 1
+                    conn = None
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_alive(conn):
+                with self._cond:
+                    self._stats['hits'] += 1
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn: Any, broken: bool = False) -> None:
+        '''Return a connection, rolling back any open or failed transaction'''
+        if not broken and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    broken = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                broken = True
+
+        if broken or conn.closed:
+            self._discard(conn)
+            return
+
+        self._last_used[id(conn)] = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.getconn()
+        try:
+            yield conn
+        except Exception:
+            self.putconn(conn, broken=bool(conn.closed))
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._stats, size=self._size, idle=len(self._idle), max_size=self.max_size)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    '''Module-level pool that survives across warm invocations'''
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                dsn = os.environ.get('DATABASE_URL')
+                if not dsn:
+                    raise ValueError('DATABASE_URL not configured')
+                _pool = ConnectionPool(
+                    dsn,
+                    max_size=int(os.environ.get('DB_POOL_MAX_SIZE', '4')),
+                    timeout=float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+                )
+    return _pool
+
+
+# Replay lag of the server behind a connection in seconds, 0 on a primary or a caught-up standby
+REPLICA_LAG_QUERY = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+'''
+
+
+class ReadRouter:
+    '''
+    Hands out replica connections for reads that tolerate replication lag
+    and primary connections for everything else. Reads fall back to the
+    primary while the replica is unreachable (for retry_after seconds) or
+    lags behind by more than max_lag seconds. The lag is sampled at most
+    once per lag_check_interval.
+    '''
+
+    def __init__(self, primary: ConnectionPool, replica: Optional[ConnectionPool] = None, max_lag: float = 5.0,
+                 retry_after: float = 10.0, lag_check_interval: float = 1.0):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.retry_after = retry_after
+        self.lag_check_interval = lag_check_interval
+        self._down_until = 0.0
+        self._lag = 0.0
+        self._lag_checked = float('-inf')
+        self._lock = threading.Lock()
+        self._stats = {
+            'primary_reads': 0, 'replica_reads': 0, 'writes': 0,
+            'read_your_writes': 0, 'fallback_unavailable': 0, 'fallback_stale': 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _mark_down(self) -> None:
+        with self._lock:
+            self._down_until = time.monotonic() + self.retry_after
+            self._stats['fallback_unavailable'] += 1
+
+    def _replica_conn(self) -> Optional[Any]:
+        '''A replica connection within the lag tolerance, None when the primary has to serve the read'''
+        now = time.monotonic()
+        if now < self._down_until:
+            self._count('fallback_unavailable')
+            return None
+        try:
+            conn = self.replica.getconn()
+        except (psycopg2.Error, PoolTimeout):
+            self._mark_down()
+            return None
+
+        if now - self._lag_checked >= self.lag_check_interval:
+            try:
+                with span('replica.lag'), conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                    cur.execute(REPLICA_LAG_QUERY)
+                    lag = float(cur.fetchone()[0])
+                conn.rollback()
+            except psycopg2.Error:
+                self.replica.putconn(conn, broken=True)
+                self._mark_down()
+                return None
+            with self._lock:
+                self._lag, self._lag_checked = lag, now
+
+        if self._lag > self.max_lag:
+            self.replica.putconn(conn)
+            self._count('fallback_stale')
+            return None
+        return conn
+
+    def getconn(self, read_only: bool = False, read_your_writes: bool = False) -> Tuple[ConnectionPool, Any]:
+        '''(pool, connection) for the request, give the connection back with pool.putconn'''
+        if read_only and self.replica is not None:
+            if read_your_writes:
+                self._count('read_your_writes')
+            else:
+                conn = self._replica_conn()
+                if conn is not None:
+                    self._count('replica_reads')
+                    return self.replica, conn
+        self._count('primary_reads' if read_only else 'writes')
+        return self.primary, self.primary.getconn()
+
+    @contextmanager
+    def connection(self, read_only: bool = False, read_your_writes: bool = False) -> Iterator[Any]:
+        pool, conn = self.getconn(read_only, read_your_writes)
+        try:
+            yield conn
+        except Exception:
+            pool.putconn(conn, broken=bool(conn.closed))
+            raise
+        else:
+            pool.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats, replica_lag=self._lag,
+                                         replica_down=time.monotonic() < self._down_until)
+        stats['primary'] = self.primary.stats()
+        if self.replica is not None:
+            stats['replica'] = self.replica.stats()
+        return stats
+
+
+_router: Optional[ReadRouter] = None
+
+
+def get_router() -> ReadRouter:
+    '''
+    Module-level router over get_pool() and, when DATABASE_READ_URL is set,
+    a replica pool. Without a replica every read goes to the primary.
+    '''
+    global _router
+    if _router is None:
+        primary = get_pool()
+        with _pool_lock:
+            if _router is None:
+                read_dsn = os.environ.get('DATABASE_READ_URL')
+                replica = None
+                if read_dsn:
+                    replica = ConnectionPool(
+                        read_dsn,
+                        max_size=int(os.environ.get('DB_READ_POOL_MAX_SIZE', os.environ.get('DB_POOL_MAX_SIZE', '4'))),
+                        timeout=float(os.environ.get('DB_READ_POOL_TIMEOUT', '2')),
+                        target='replica',
+                        connect_timeout=float(os.environ.get('DB_READ_CONNECT_TIMEOUT', '2')),
+                    )
+                _router = ReadRouter(
+                    primary,
+                    replica,
+                    max_lag=float(os.environ.get('REPLICA_MAX_LAG', '5')),
+                    retry_after=float(os.environ.get('REPLICA_RETRY_AFTER', '10')),
+                    lag_check_interval=float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '1')),
+                )
+    return _router
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    '''
+    Counters of the router (with its pools) or, when no router was built, of
+    the pool; None before the first connection. Never opens a pool.
+    '''
+    if _router is not None:
+        return _router.stats()
+    return _pool.stats() if _pool is not None else None
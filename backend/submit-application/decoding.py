@@ -0,0 +1,61 @@
+import base64
+from typing import Dict, Any, List, Union
+
+from pydantic import TypeAdapter, ValidationError
+
+# Discriminator failures of a tagged union, reported against the tag field
+TAG_ERRORS = {'union_tag_invalid', 'union_tag_not_found'}
+
+
+class InvalidRequest(ValueError):
+    '''Request body failed validation, carries one entry per problem for the 400 response'''
+
+    def __init__(self, errors: List[Dict[str, str]]):
+        first = errors[0]
+        super().__init__(f"{first['field']}: {first['message']}" if first['field'] else first['message'])
+        self.errors = errors
+
+
+def raw_body(event: Dict[str, Any]) -> Union[str, bytes]:
+    '''Body exactly as received, base64-decoded when the runtime marks it so'''
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    return body
+
+
+def is_array(raw: Union[str, bytes]) -> bool:
+    '''Whether the body is a JSON array, judged by its first significant character'''
+    head = raw.lstrip()[:1]
+    return head in ('[', b'[')
+
+
+def field_errors(exc: ValidationError, tag: str = '') -> List[Dict[str, str]]:
+    '''
+    Flatten pydantic errors into field/message pairs. For a union discriminated
+    by tag, the first location item is the matched variant and is dropped.
+    '''
+    errors = []
+    for error in exc.errors(include_url=False):
+        if error['type'] in TAG_ERRORS:
+            errors.append({'field': tag, 'message': f'Invalid {tag}'})
+            continue
+        loc = error['loc'][1:] if tag and error['loc'] else error['loc']
+        errors.append({'field': '.'.join(str(part) for part in loc), 'message': error['msg']})
+    return errors
+
+
+def decode_body(validator: TypeAdapter, raw: Union[str, bytes], tag: str = '') -> Any:
+    '''Parse and validate the raw body in one pass with a validator built at import time'''
+    try:
+        return validator.validate_json(raw)
+    except ValidationError as e:
+        raise InvalidRequest(field_errors(e, tag))
+
+
+def validate_item(validator: TypeAdapter, item: Any, tag: str = '') -> Any:
+    '''Validate one already parsed element of a batch'''
+    try:
+        return validator.validate_python(item)
+    except ValidationError as e:
+        raise InvalidRequest(field_errors(e, tag))
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+from typing import Dict, Any, Optional, Tuple
+
+from timing import span
+
+# How long a key keeps answering with its original application, in seconds
+IDEMPOTENCY_WINDOW = int(os.environ.get('IDEMPOTENCY_WINDOW', '86400'))
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(ValueError):
+    '''The client reused an Idempotency-Key for a different application'''
+
+
+class InvalidIdempotencyKey(ValueError):
+    '''Idempotency-Key header is empty or too long'''
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def submission_key(header: Optional[str], data: Dict[str, Any]) -> Tuple[str, str]:
+    '''
+    (key, request hash) of a validated application. The key is the client's
+    Idempotency-Key when sent, otherwise derived from the normalized email,
+    application_type and payload, so double clicks and blind retries collapse.
+    '''
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    request_hash = _sha256(payload)
+    if header is not None:
+        header = header.strip()
+        if not header or len(header) > MAX_KEY_LENGTH:
+            raise InvalidIdempotencyKey(f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters')
+        return 'client:' + _sha256(header), request_hash
+    content = json.dumps([data['email'].strip().lower(), data['application_type'], request_hash])
+    return 'content:' + _sha256(content), request_hash
+
+
+def claim(cur: Any, key: str, request_hash: str) -> Optional[int]:
+    '''
+    Take the key inside the caller's transaction. Returns None when this
+    request owns it and must do the work, or the application_id of the
+    original request. A concurrent duplicate waits on the unique index until
+    the original commits (and takes over the key if it rolled back).
+    '''
+    with span('idempotency'):
+        cur.execute('''
+            INSERT INTO application_submissions (idempotency_key, request_hash)
+            VALUES (%s, %s)
+            ON CONFLICT (idempotency_key) DO UPDATE
+            SET request_hash = EXCLUDED.request_hash, application_id = NULL, created_at = CURRENT_TIMESTAMP
+            WHERE application_submissions.created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            RETURNING idempotency_key
+        ''', (key, request_hash, IDEMPOTENCY_WINDOW))
+        if cur.fetchone() is not None:
+            return None
+        cur.execute('''
+            SELECT application_id, request_hash FROM application_submissions WHERE idempotency_key = %s
+        ''', (key,))
+        application_id, original_hash = cur.fetchone()
+    if original_hash != request_hash:
+        raise IdempotencyConflict('Idempotency-Key was already used for a different application')
+    return application_id
+
+
+def record(cur: Any, key: str, application_id: int) -> None:
+    '''Attach the new application to the claimed key and drop keys whose window has passed'''
+    cur.execute('''
+        UPDATE application_submissions SET application_id = %s WHERE idempotency_key = %s
+    ''', (application_id, key))
+    cur.execute('''
+        DELETE FROM application_submissions
+        WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+    ''', (IDEMPOTENCY_WINDOW,))
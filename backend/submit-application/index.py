@@ -1,93 +1,25 @@
 import json
-import smtplib
-import os
-import psycopg2
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, Optional
-from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, Any, Optional, Tuple
 
-class ApplicantData(BaseModel):
-    name: str = Field(..., min_length=1)
-    surname: str = Field(..., min_length=1)
-    email: EmailStr
-    phone: str = Field(..., min_length=1)
-    position: str = Field(..., min_length=1)
-    experience: int = Field(..., ge=0)
-    cover_letter: str = Field(..., min_length=1)
-    portfolio_url: Optional[str] = None
+from timing import instrumented, span
 
-class StudentData(BaseModel):
-    name: str = Field(..., min_length=1)
-    surname: str = Field(..., min_length=1)
-    email: EmailStr
-    phone: str = Field(..., min_length=1)
-    university: str = Field(..., min_length=1)
-    course: int = Field(..., ge=1, le=6)
-    specialty: str = Field(..., min_length=1)
-    direction: str = Field(..., min_length=1)
-    motivation_letter: str = Field(..., min_length=1)
-    portfolio_url: Optional[str] = None
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
 
-def send_email(name: str, surname: str, email: str) -> bool:
-    '''Send confirmation email to applicant'''
-    smtp_host = os.environ.get('SMTP_HOST')
-    smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-    smtp_user = os.environ.get('SMTP_USER')
-    smtp_password = os.environ.get('SMTP_PASSWORD')
-    
-    if not all([smtp_host, smtp_user, smtp_password]):
-        return False
-    
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = 'Ваша анкета получена'
-    msg['From'] = smtp_user
-    msg['To'] = email
-    
-    text_content = f'''Добрый день, {name} {surname},
-
-Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.
-
-С уважением,
-Отдел кадров'''
-    
-    html_content = f'''
-    <html>
-      <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-          <h2 style="color: #0EA5E9;">Ваша анкета получена</h2>
-          <p>Добрый день, <strong>{name} {surname}</strong>,</p>
-          <p>Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.</p>
-          <br>
-          <p style="color: #666;">С уважением,<br>Отдел кадров</p>
-        </div>
-      </body>
-    </html>
+def save_to_database(application_type: str, data: Dict[str, Any], idempotency_key: str, request_hash: str) -> Tuple[int, bool]:
     '''
-    
-    part1 = MIMEText(text_content, 'plain', 'utf-8')
-    part2 = MIMEText(html_content, 'html', 'utf-8')
-    
-    msg.attach(part1)
-    msg.attach(part2)
-    
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
-        return True
-    except Exception:
-        return False
-
-def save_to_database(application_type: str, data: Dict[str, Any]) -> int:
-    '''Save application to database and return application ID'''
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise ValueError('DATABASE_URL not configured')
-    
-    conn = psycopg2.connect(database_url)
-    cur = conn.cursor()
+    Save application and queue its confirmation email in one transaction.
+    Returns (application ID, replayed): a duplicate inside the idempotency
+    window gets the original ID back without inserting or queueing again.
+    '''
+    from db import get_pool
+    from idempotency import claim, record
+    from outbox import enqueue_confirmation
     
     if application_type == 'applicant':
         query = '''
@@ -128,18 +60,24 @@ def save_to_database(application_type: str, data: Dict[str, Any]) -> int:
             data.get('portfolio_url')
         )
     
-    cur.execute(query, values)
-    application_id = cur.fetchone()[0]
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    return application_id
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            original_id = claim(cur, idempotency_key, request_hash)
+            if original_id is not None:
+                conn.rollback()
+                return original_id, True
+            cur.execute(query, values)
+            application_id = cur.fetchone()[0]
+            enqueue_confirmation(cur, application_id, application_type, data['name'], data['surname'], data['email'])
+            record(cur, idempotency_key, application_id)
+        conn.commit()
+    
+    return application_id, False
 
+@instrumented
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Business: Save job application to database and send confirmation email
+    Business: Save job application to database and queue confirmation email
     Args: event with httpMethod, body containing application data
           context with request_id
     Returns: HTTP response with success/error status
@@ -152,7 +90,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, Idempotency-Key',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
@@ -169,39 +107,79 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    body_data = json.loads(event.get('body', '{}'))
-    application_type = body_data.get('application_type')
+    from admission import get_bucket
     
-    if application_type == 'applicant':
-        validated_data = ApplicantData(**body_data)
-    elif application_type == 'student':
-        validated_data = StudentData(**body_data)
-    else:
+    bucket = get_bucket()
+    retry_after = bucket.acquire() if bucket else 0
+    if retry_after:
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'Retry-After',
+                'Retry-After': str(retry_after)
+            },
+            'body': json.dumps({'error': 'Too many applications right now, please retry shortly', 'retry_after': retry_after}),
+            'isBase64Encoded': False
+        }
+    
+    from decoding import InvalidRequest, decode_body, raw_body
+    from idempotency import IdempotencyConflict, InvalidIdempotencyKey, submission_key
+    from models import APPLICATION_VALIDATOR
+    
+    try:
+        with span('validate'):
+            application = decode_body(APPLICATION_VALIDATOR, raw_body(event), tag='application_type')
+            data = application.model_dump()
+            idempotency_key, request_hash = submission_key(get_header(event, 'Idempotency-Key'), data)
+    except InvalidIdempotencyKey as e:
         return {
             'statusCode': 400,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'error': 'Invalid application_type'}),
+            'body': json.dumps({'error': str(e)}),
+            'isBase64Encoded': False
+        }
+    except InvalidRequest as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e), 'errors': e.errors}),
             'isBase64Encoded': False
         }
     
-    application_id = save_to_database(application_type, validated_data.model_dump())
-    
-    email_sent = send_email(validated_data.name, validated_data.surname, validated_data.email)
+    try:
+        application_id, replayed = save_to_database(application.application_type, data, idempotency_key, request_hash)
+    except IdempotencyConflict as e:
+        return {
+            'statusCode': 422,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)}),
+            'isBase64Encoded': False
+        }
     
     return {
         'statusCode': 200,
         'headers': {
             'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Idempotent-Replayed',
+            'Idempotent-Replayed': 'true' if replayed else 'false'
         },
         'body': json.dumps({
             'success': True,
             'application_id': application_id,
-            'email_sent': email_sent,
-            'message': f'Application saved successfully. Email {"sent" if email_sent else "not sent (SMTP not configured)"}'
+            'email_queued': True,
+            'message': 'Application saved successfully. Confirmation email queued'
         }),
         'isBase64Encoded': False
     }
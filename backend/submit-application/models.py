@@ -0,0 +1,35 @@
+from typing import Annotated, Literal, Optional, Union
+
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter
+
+
+class ApplicantData(BaseModel):
+    application_type: Literal['applicant']
+    name: str = Field(..., min_length=1)
+    surname: str = Field(..., min_length=1)
+    email: EmailStr
+    phone: str = Field(..., min_length=1)
+    position: str = Field(..., min_length=1)
+    experience: int = Field(..., ge=0)
+    cover_letter: str = Field(..., min_length=1)
+    portfolio_url: Optional[str] = None
+
+
+class StudentData(BaseModel):
+    application_type: Literal['student']
+    name: str = Field(..., min_length=1)
+    surname: str = Field(..., min_length=1)
+    email: EmailStr
+    phone: str = Field(..., min_length=1)
+    university: str = Field(..., min_length=1)
+    course: int = Field(..., ge=1, le=6)
+    specialty: str = Field(..., min_length=1)
+    direction: str = Field(..., min_length=1)
+    motivation_letter: str = Field(..., min_length=1)
+    portfolio_url: Optional[str] = None
+
+
+Application = Annotated[Union[ApplicantData, StudentData], Field(discriminator='application_type')]
+
+# Built once per container on first import, picks the model by application_type
+APPLICATION_VALIDATOR = TypeAdapter(Application)
@@ -0,0 +1,9 @@
+from typing import Any
+
+
+def enqueue_confirmation(cur: Any, application_id: int, application_type: str, name: str, surname: str, email: str) -> None:
+    '''Queue a confirmation email inside the caller's transaction, backend/email-outbox sends it'''
+    cur.execute('''
+        INSERT INTO email_outbox (application_id, application_type, recipient, name, surname)
+        VALUES (%s, %s, %s, %s, %s)
+    ''', (application_id, application_type, email, name, surname))
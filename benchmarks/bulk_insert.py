@@ -0,0 +1,66 @@
+'''
+Rows/sec of the department bulk POST against one POST per row.
+
+    DATABASE_URL=postgresql://... python benchmarks/bulk_insert.py --rows 2000
+
+Writes into the target database, use a disposable one.
+'''
+import argparse
+import json
+import time
+
+from common import Context, load_handler, make_event, require_database
+
+
+def employee_rows(count: int, group_id: int):
+    return [
+        {'group_id': group_id, 'name': f'Сотрудник {i}', 'position': 'Специалист', 'email': f'bench{i}@example.com'}
+        for i in range(count)
+    ]
+
+
+def task_rows(count: int, group_id: int):
+    return [
+        {'group_id': group_id, 'title': f'Задача {i}', 'priority': 'medium', 'due_date': '2030-01-01'}
+        for i in range(count)
+    ]
+
+
+def per_row(handler, resource: str, rows) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        response = handler(make_event('POST', {'resource': resource}, row), Context('department'))
+        assert response['statusCode'] == 200, response['body']
+    return time.perf_counter() - started
+
+
+def bulk(handler, resource: str, rows, batch: int) -> float:
+    started = time.perf_counter()
+    for offset in range(0, len(rows), batch):
+        chunk = rows[offset:offset + batch]
+        response = handler(make_event('POST', {'resource': resource}, chunk), Context('department'))
+        assert response['statusCode'] == 200, response['body']
+        assert len(json.loads(response['body'])['ids']) == len(chunk)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--group-id', type=int, default=1)
+    args = parser.parse_args()
+
+    require_database()
+    handler = load_handler('department')
+
+    for resource, generate in (('employees', employee_rows), ('tasks', task_rows)):
+        rows = generate(args.rows, args.group_id)
+        single = per_row(handler, resource, rows)
+        batched = bulk(handler, resource, rows, args.batch)
+        print(f'{resource:10s} per-row {args.rows / single:10.0f} rows/s   '
+              f'bulk {args.rows / batched:10.0f} rows/s   x{single / batched:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+'''
+Cold start of each function: import time of index.py under
+`python -X importtime`, latency of the first preflight (OPTIONS and, where
+the function has one, the 405 path) and of the first real request. Every
+run is a fresh interpreter. Medians are checked against
+cold_start_budget.json, which also lists modules that must stay unloaded
+until a request needs them; any violation exits non-zero.
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py submit-application --no-request
+
+The first real request needs DATABASE_URL for every function but
+send-application-email; the functions that send mail get a local SMTP
+sink.
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+from common import Context, load_handler, make_event
+
+HERE = Path(__file__).resolve().parent
+BUDGET_FILE = HERE / 'cold_start_budget.json'
+
+# Requests that must not pull in any deferred module
+PREFLIGHT = {
+    'department': [make_event('OPTIONS')],
+    'submit-application': [make_event('OPTIONS'), make_event('GET')],
+    'send-application-email': [make_event('OPTIONS'), make_event('GET')],
+    'applications': [make_event('OPTIONS'), make_event('GET')],
+    # Timer function without a preflight: a rejected timer payload stands in for the cheap path
+    'email-outbox': [{'batch_size': 'many'}],
+}
+
+# Functions whose first request talks to SMTP
+MAIL_FUNCTIONS = ('send-application-email', 'email-outbox')
+
+EXPORT_TOKEN = 'cold-start-probe'
+
+FIRST_REQUEST = {
+    'department': make_event('GET', {'resource': 'groups'}),
+    'submit-application': make_event('POST', body={
+        'application_type': 'applicant',
+        'name': 'Иван',
+        'surname': 'Иванов',
+        'email': 'cold-start@example.com',
+        'phone': '+79991234567',
+        'position': 'Backend Developer',
+        'experience': 3,
+        'cover_letter': 'Cold start probe',
+    }),
+    'send-application-email': make_event('POST', body={
+        'name': 'Иван',
+        'surname': 'Иванов',
+        'email': 'cold-start@example.com',
+        'application_type': 'applicant',
+    }),
+    'applications': make_event('GET', {'limit': '100'}, headers={'X-Export-Token': EXPORT_TOKEN}),
+    'email-outbox': {},
+}
+
+
+def probe(function: str, deferred: List[str], request: bool) -> None:
+    '''Child process: load one function, run its preflights and optionally one real request'''
+    def loaded() -> List[str]:
+        return [name for name in deferred if name in sys.modules]
+
+    result: Dict[str, Any] = {}
+    started = time.perf_counter()
+    handler = load_handler(function)
+    result['import_wall_ms'] = (time.perf_counter() - started) * 1000
+    result['loaded_after_import'] = loaded()
+
+    started = time.perf_counter()
+    for event in PREFLIGHT[function]:
+        handler(event, Context(function))
+    result['preflight_ms'] = (time.perf_counter() - started) * 1000
+    result['loaded_after_preflight'] = loaded()
+
+    if request:
+        started = time.perf_counter()
+        response = handler(FIRST_REQUEST[function], Context(function))
+        result['first_request_ms'] = (time.perf_counter() - started) * 1000
+        result['first_request_status'] = response['statusCode']
+
+    print(json.dumps(result))
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    '''
+    Cumulative import time of index in ms and its direct children, from
+    -X importtime output. Children are printed before their parent, one
+    indentation level deeper.
+    '''
+    children: List[Tuple[str, float]] = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == 'index':
+                return int(cumulative) / 1000, sorted(children, key=lambda child: -child[1])
+            children = []
+        elif depth == 1:
+            children.append((name, int(cumulative) / 1000))
+    raise RuntimeError('index was not imported')
+
+
+def run_once(function: str, deferred: List[str], request: bool, env: Dict[str, str]) -> Dict[str, Any]:
+    command = [sys.executable, '-X', 'importtime', __file__, '--probe', function, '--deferred', ','.join(deferred)]
+    if request:
+        command.append('--request')
+    completed = subprocess.run(command, capture_output=True, text=True, env=env, cwd=HERE)
+    if completed.returncode != 0:
+        raise RuntimeError(f'{function} probe failed:\n{completed.stderr[-2000:]}')
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['import_ms'], result['children'] = parse_importtime(completed.stderr)
+    return result
+
+
+def measure(function: str, budget: Dict[str, Any], runs: int, request: bool, env: Dict[str, str]) -> List[str]:
+    '''Print the medians for one function and return its budget violations'''
+    results = [run_once(function, budget['deferred'], request, env) for _ in range(runs)]
+    import_ms = statistics.median(result['import_ms'] for result in results)
+    preflight_ms = statistics.median(result['preflight_ms'] for result in results)
+    first = [result['first_request_ms'] for result in results if 'first_request_ms' in result]
+
+    print(f'{function}')
+    print(f'  import index      {import_ms:8.1f} ms  (budget {budget["import_ms"]} ms)')
+    print(f'  first preflight   {preflight_ms:8.2f} ms  (budget {budget["preflight_ms"]} ms)')
+    if first:
+        print(f'  first request     {statistics.median(first):8.1f} ms  status {results[-1]["first_request_status"]}')
+    slowest = ', '.join(f'{name} {ms:.1f}' for name, ms in results[-1]['children'][:5])
+    print(f'  slowest imports   {slowest}')
+
+    violations = []
+    if import_ms > budget['import_ms']:
+        violations.append(f'{function}: import took {import_ms:.1f} ms, budget is {budget["import_ms"]} ms')
+    if preflight_ms > budget['preflight_ms']:
+        violations.append(f'{function}: preflight took {preflight_ms:.2f} ms, budget is {budget["preflight_ms"]} ms')
+    for stage in ('loaded_after_import', 'loaded_after_preflight'):
+        eager = sorted({name for result in results for name in result[stage]})
+        if eager:
+            violations.append(f'{function}: {", ".join(eager)} {stage.replace("_", " ")}')
+    return violations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('functions', nargs='*', default=list(PREFLIGHT))
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per function')
+    parser.add_argument('--no-request', action='store_true', help='skip the first real request')
+    parser.add_argument('--probe', help=argparse.SUPPRESS)
+    parser.add_argument('--deferred', default='', help=argparse.SUPPRESS)
+    parser.add_argument('--request', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe(args.probe, [name for name in args.deferred.split(',') if name], args.request)
+        return
+
+    budgets = json.loads(BUDGET_FILE.read_text())
+    env = dict(os.environ, EXPORT_TOKEN=EXPORT_TOKEN)
+    sink = None
+    violations: List[str] = []
+
+    for function in args.functions:
+        request = not args.no_request
+        if function in MAIL_FUNCTIONS and request and sink is None:
+            from smtp_sink import start_sink
+            sink = start_sink()
+            env.update({
+                'SMTP_HOST': '127.0.0.1',
+                'SMTP_PORT': str(sink.server_address[1]),
+                'SMTP_USER': 'bench@example.com',
+                'SMTP_PASSWORD': 'bench',
+                'SMTP_STARTTLS': 'false',
+            })
+        if function != 'send-application-email' and request and not env.get('DATABASE_URL'):
+            print(f'{function}: DATABASE_URL is not set, skipping the first real request')
+            request = False
+        violations.extend(measure(function, budgets[function], args.runs, request, env))
+
+    if violations:
+        print('\nbudget exceeded:')
+        for violation in violations:
+            print(f'  {violation}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
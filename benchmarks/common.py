@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / 'backend'
+
+_loaded: Optional[str] = None
+
+# Keep per-request log lines out of benchmark output unless asked for
+os.environ.setdefault('REQUEST_LOG', 'false')
+
+
+class Context:
+    '''Minimal stand-in for the runtime context object'''
+
+    def __init__(self, function_name: str):
+        self.request_id = str(uuid.uuid4())
+        self.function_name = function_name
+
+
+def load_handler(function: str) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    '''
+    Import backend/<function>/index.py the way the runtime does, with the
+    function directory first on sys.path. Functions share module names
+    (index, db, ...), so only one function can be loaded per process.
+    Uses the import statement machinery so -X importtime sees index.
+    '''
+    global _loaded
+    if _loaded is not None and _loaded != function:
+        raise RuntimeError(f'{_loaded} is already loaded in this process')
+    if _loaded is None:
+        sys.path.insert(0, str(BACKEND / function))
+        _loaded = function
+    return __import__('index').handler
+
+
+def make_event(method: str, params: Optional[Dict[str, str]] = None, body: Any = None,
+               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    event: Dict[str, Any] = {
+        'httpMethod': method,
+        'queryStringParameters': params or {},
+        'headers': headers or {},
+    }
+    if body is not None:
+        event['body'] = body if isinstance(body, str) else json.dumps(body)
+    return event
+
+
+def require_database() -> str:
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL must point at a disposable database with all migrations applied')
+    return dsn
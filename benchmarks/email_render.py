@@ -0,0 +1,70 @@
+'''
+Per-message render cost of the confirmation email: the previous
+MIMEMultipart build + serialization against email_templates.
+
+    python benchmarks/email_render.py --messages 20000
+'''
+import argparse
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from common import load_handler
+
+
+def legacy_message(name: str, surname: str, email: str, sender: str) -> bytes:
+    '''Message as send_email built it before the template module'''
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = 'Ваша анкета получена'
+    msg['From'] = sender
+    msg['To'] = email
+    text_content = f'''Добрый день, {name} {surname},
+
+Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.
+
+С уважением,
+Отдел кадров'''
+    html_content = f'''
+    <html>
+      <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+          <h2 style="color: #0EA5E9;">Ваша анкета получена</h2>
+          <p>Добрый день, <strong>{name} {surname}</strong>,</p>
+          <p>Ваша анкета получена, в ближайшее время она будет рассмотрена и с Вами обязательно свяжутся.</p>
+          <br>
+          <p style="color: #666;">С уважением,<br>Отдел кадров</p>
+        </div>
+      </body>
+    </html>
+    '''
+    msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+    msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+    return msg.as_bytes()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=10000)
+    args = parser.parse_args()
+
+    load_handler('send-application-email')
+    from email_templates import render_confirmation
+
+    people = [('Иван', f'Иванов{i}', f'user{i}@example.com') for i in range(args.messages)]
+
+    started = time.perf_counter()
+    for name, surname, email in people:
+        legacy_message(name, surname, email, 'hr@example.com')
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for name, surname, email in people:
+        render_confirmation('applicant', name, surname, email, 'hr@example.com')
+    templated = time.perf_counter() - started
+
+    print(f'MIMEMultipart   {legacy / args.messages * 1e6:8.1f} us/message')
+    print(f'email_templates {templated / args.messages * 1e6:8.1f} us/message   x{legacy / templated:.1f}')
+
+
+if __name__ == '__main__':
+    main()
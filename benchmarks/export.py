@@ -0,0 +1,91 @@
+'''
+Rows/sec and peak Python memory of exporting every application through
+the applications function, following X-Next-Cursor page by page, against
+one fetchall of the whole table encoded in memory.
+
+    DATABASE_URL=postgresql://... python benchmarks/export.py --reset --applications 200000 --format csv
+
+With --reset the database is truncated and reseeded with --applications
+rows by benchmarks/seed.py (it must look disposable), otherwise the
+applications already in it are exported.
+'''
+import argparse
+import os
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from common import Context, load_handler, make_event, require_database
+from seed import add_reset_argument, seed_database
+
+TOKEN = 'benchmark-export-token'
+
+
+def export_pages(handler: Any, export_format: str, limit: int) -> Dict[str, Any]:
+    pages = rows = size = 0
+    peak = 0
+    cursor = None
+    started = time.perf_counter()
+    while True:
+        params = {'format': export_format, 'limit': str(limit)}
+        if cursor:
+            params['cursor'] = cursor
+        tracemalloc.start()
+        response = handler(make_event('GET', params, headers={'X-Export-Token': TOKEN}), Context('applications'))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"export failed: {response['statusCode']} {response['body']}")
+        pages += 1
+        rows += int(response['headers']['X-Row-Count'])
+        size += len(response['body'])
+        cursor = response['headers'].get('X-Next-Cursor')
+        if not cursor:
+            break
+    return {'pages': pages, 'rows': rows, 'bytes': size, 'seconds': time.perf_counter() - started, 'peak': peak}
+
+
+def export_whole(conn: Any, export_format: str) -> Dict[str, Any]:
+    from export import COLUMNS, ENCODERS
+
+    started = time.perf_counter()
+    tracemalloc.start()
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(COLUMNS)} FROM applications ORDER BY id")
+        rows = cur.fetchall()
+    body = ENCODERS[export_format](rows, True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    conn.rollback()
+    return {'pages': 1, 'rows': len(rows), 'bytes': len(body), 'seconds': time.perf_counter() - started, 'peak': peak}
+
+
+def report(label: str, result: Dict[str, Any]) -> None:
+    print(f"{label:<28} {result['rows']:>8} rows {result['pages']:>4} pages "
+          f"{result['rows'] / result['seconds']:>10.0f} rows/s "
+          f"{result['bytes'] / 2 ** 20:>8.1f} MiB out  peak {result['peak'] / 2 ** 20:>7.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=200000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--limits', type=int, nargs='+', default=[10000, 50000])
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    import psycopg2
+    conn = psycopg2.connect(require_database())
+    if args.reset:
+        seed_database(conn, groups=1, employees=0, tasks=0, applications=args.applications)
+
+    os.environ['EXPORT_TOKEN'] = TOKEN
+    handler = load_handler('applications')
+
+    report('fetchall + encode', export_whole(conn, args.format))
+    for limit in args.limits:
+        report(f'paged export limit={limit}', export_pages(handler, args.format, limit))
+
+
+if __name__ == '__main__':
+    main()
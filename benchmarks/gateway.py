@@ -0,0 +1,412 @@
+'''
+Local HTTP gateway in front of the cloud functions, for load testing them
+the way they run in production: many concurrent requests against warm
+containers. Every function directory with an index.py in backend/ is
+served under /<name> (the names func2url.json uses), e.g.
+http://127.0.0.1:8000/department?resource=groups. HTTP
+requests become the event/context the runtime passes to handler(), the
+handler's response dict becomes the HTTP response.
+
+Each function runs in --processes worker processes of --threads threads
+(functions share module names, so a process only ever loads one), and
+each request goes to the least busy worker. Workers are started once and
+stay warm, so connection pools, response caches and prepared statements
+live across requests like in a warm container. A worker that dies fails
+its in-flight requests with 502 and is replaced by a cold one, which
+shows up in the metrics.
+
+GET /__gateway/metrics returns per function: requests, in-flight, statuses,
+req/sec overall and over the last 10 s, p50/p95/p99 of gateway latency,
+handler time and queue wait, Server-Timing spans (db.wait, db.query, ...)
+and per worker import time, first request and request count.
+
+    DATABASE_URL=postgresql://... python benchmarks/gateway.py --port 8000 --processes 2 --threads 4
+    DATABASE_URL=postgresql://... python benchmarks/loadtest.py --gateway http://127.0.0.1:8000
+
+Workers inherit the environment, so DB_POOL_MAX_SIZE, CACHE_MAX_ENTRIES,
+ADMISSION_RATE and the rest apply per worker process.
+'''
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from common import BACKEND, Context, load_handler, make_event
+from loadtest import percentile
+
+METRICS_PATH = '/__gateway/metrics'
+RECENT = 10000
+WINDOW = 10.0
+SPAN = re.compile(r'([\w.]+);dur=([\d.]+)')
+
+
+def function_names() -> List[str]:
+    '''Every backend/<name>/index.py, including functions not deployed to func2url.json yet'''
+    return sorted(path.parent.name for path in BACKEND.glob('*/index.py'))
+
+
+def worker_main(function: str, threads: int, conn: Any) -> None:
+    '''Worker process: import the function once, then serve jobs from the pipe on `threads` threads until None or EOF'''
+    started = time.perf_counter()
+    handler = load_handler(function)
+    send_lock = threading.Lock()
+    conn.send(('ready', os.getpid(), (time.perf_counter() - started) * 1000))
+    jobs: queue.Queue = queue.Queue()
+
+    def serve() -> None:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            job_id, event, enqueued = job
+            picked = time.time()
+            try:
+                response = handler(event, Context(function))
+                error = None
+            except Exception as e:
+                response, error = None, f'{type(e).__name__}: {e}'
+            handler_ms = (time.time() - picked) * 1000
+            try:
+                with send_lock:
+                    conn.send(('done', job_id, (response, error, (picked - enqueued) * 1000, handler_ms)))
+            except OSError:
+                return
+
+    pool = [threading.Thread(target=serve) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            job = None
+        if job is None:
+            break
+        jobs.put(job)
+    for _ in pool:
+        jobs.put(None)
+    for thread in pool:
+        thread.join()
+
+
+class FunctionMetrics:
+    '''Counters and recent samples of one function, safe to update from request threads'''
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.monotonic()
+        self.requests = 0
+        self.in_flight = 0
+        self.statuses: Counter = Counter()
+        self.finished: Deque[float] = deque(maxlen=RECENT)
+        self.latency: Deque[float] = deque(maxlen=RECENT)
+        self.handler: Deque[float] = deque(maxlen=RECENT)
+        self.queue_wait: Deque[float] = deque(maxlen=RECENT)
+        self.spans: Dict[str, Deque[float]] = {}
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, status: str, latency_ms: float, handler_ms: Optional[float] = None,
+            wait_ms: Optional[float] = None, server_timing: str = '') -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.statuses[status] += 1
+            self.finished.append(time.monotonic())
+            self.latency.append(latency_ms)
+            if handler_ms is not None:
+                self.handler.append(handler_ms)
+                self.queue_wait.append(wait_ms)
+            for name, duration in SPAN.findall(server_timing):
+                self.spans.setdefault(name, deque(maxlen=RECENT)).append(float(duration))
+
+    def worker_ready(self, pid: int, import_ms: float) -> None:
+        with self._lock:
+            self.workers[pid] = {'import_ms': round(import_ms, 2), 'first_request_ms': None, 'requests': 0, 'alive': True}
+
+    def worker_served(self, pid: int, handler_ms: float) -> None:
+        with self._lock:
+            worker = self.workers.setdefault(pid, {'import_ms': None, 'first_request_ms': None, 'requests': 0, 'alive': True})
+            if worker['first_request_ms'] is None:
+                worker['first_request_ms'] = round(handler_ms, 2)
+            worker['requests'] += 1
+
+    def worker_exited(self, pid: int) -> None:
+        with self._lock:
+            if pid in self.workers:
+                self.workers[pid]['alive'] = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        def summary(samples: Deque[float]) -> Dict[str, float]:
+            values = sorted(samples)
+            return {f'p{int(q * 100)}_ms': round(percentile(values, q), 2) for q in (0.5, 0.95, 0.99)}
+
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'requests': self.requests,
+                'in_flight': self.in_flight,
+                'statuses': dict(self.statuses),
+                'rps': round(self.requests / max(now - self.started, 1e-9), 1),
+                'rps_10s': round(sum(1 for finished in self.finished if finished > now - WINDOW) / WINDOW, 1),
+                'latency': summary(self.latency),
+                'handler': summary(self.handler),
+                'queue_wait': summary(self.queue_wait),
+                'spans': {name: summary(samples) for name, samples in sorted(self.spans.items())},
+                'workers': {str(pid): dict(worker) for pid, worker in self.workers.items()},
+            }
+
+
+class WorkerProcess:
+    '''One warm worker and the parent end of its pipe'''
+
+    def __init__(self, context: Any, function: str, threads: int):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(function, threads, child), daemon=True)
+        self.process.start()
+        child.close()
+        self.in_flight = 0
+        self.ready = False
+        self.alive = True
+        self.send_lock = threading.Lock()
+
+    def send(self, job: Any) -> None:
+        with self.send_lock:
+            self.conn.send(job)
+
+
+class FunctionPool:
+    '''
+    Worker processes of one function. Each request goes to the worker with
+    the fewest jobs in flight, a reader thread per worker resolves the
+    futures. Workers get their own pipe, so one that dies only fails its own
+    jobs (502) and is replaced by a cold one.
+    '''
+
+    def __init__(self, name: str, processes: int, threads: int):
+        self.name = name
+        self.threads = threads
+        self.metrics = FunctionMetrics(name)
+        self._mp = multiprocessing.get_context('spawn')
+        self._pending: Dict[int, Tuple[Future, WorkerProcess]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self._closing = False
+        self.workers = [self._spawn() for _ in range(processes)]
+
+    def _spawn(self) -> WorkerProcess:
+        worker = WorkerProcess(self._mp, self.name, self.threads)
+        threading.Thread(target=self._read, args=(worker,), daemon=True).start()
+        return worker
+
+    def submit(self, event: Dict[str, Any]) -> Tuple[int, Future]:
+        future: Future = Future()
+        with self._lock:
+            job_id = next(self._ids)
+            live = [worker for worker in self.workers if worker.alive]
+            if not live:
+                future.set_result((None, f'No live {self.name} workers, see the gateway log', 0.0, None))
+                return job_id, future
+            worker = min(live, key=lambda worker: worker.in_flight)
+            worker.in_flight += 1
+            self._pending[job_id] = (future, worker)
+        try:
+            worker.send((job_id, event, time.time()))
+        except OSError:
+            self._resolve(job_id, (None, f'Worker {worker.process.pid} is gone', 0.0, None))
+        return job_id, future
+
+    def forget(self, job_id: int) -> None:
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+            if entry is not None:
+                entry[1].in_flight -= 1
+
+    def _resolve(self, job_id: int, result: Tuple[Any, ...]) -> None:
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+            if entry is not None:
+                entry[1].in_flight -= 1
+        if entry is not None:
+            entry[0].set_result(result)
+
+    def _read(self, worker: WorkerProcess) -> None:
+        while True:
+            try:
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == 'ready':
+                worker.ready = True
+                self.metrics.worker_ready(message[1], message[2])
+                continue
+            _, job_id, result = message
+            self.metrics.worker_served(worker.process.pid, result[3])
+            self._resolve(job_id, result)
+
+        worker.process.join(timeout=1)
+        with self._lock:
+            worker.alive = False
+            lost = [job_id for job_id, (_, owner) in self._pending.items() if owner is worker]
+            # A worker that never got ready failed to import, respawning it would only loop
+            if worker.ready and not self._closing:
+                self.workers[self.workers.index(worker)] = self._spawn()
+        self.metrics.worker_exited(worker.process.pid)
+        for job_id in lost:
+            self._resolve(job_id, (None, f'Worker {worker.process.pid} exited with {worker.process.exitcode}', 0.0, None))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closing = True
+        for worker in self.workers:
+            try:
+                worker.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+
+def build_event(method: str, target: str, headers: Dict[str, str], body: bytes, client_ip: str) -> Tuple[str, Dict[str, Any]]:
+    '''(function name, event) for an HTTP request to /<function>[/...]'''
+    parts = urlsplit(target)
+    name = parts.path.strip('/').split('/', 1)[0]
+    encoded = False
+    text: Optional[str] = None
+    if body:
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            text, encoded = base64.b64encode(body).decode('ascii'), True
+    event = make_event(method, dict(parse_qsl(parts.query, keep_blank_values=True)), text, headers)
+    event.update({
+        'path': parts.path,
+        'isBase64Encoded': encoded,
+        'requestContext': {
+            'requestId': str(uuid.uuid4()),
+            'httpMethod': method,
+            'identity': {'sourceIp': client_ip},
+        },
+    })
+    return name, event
+
+
+def make_request_handler(pools: Dict[str, FunctionPool], timeout: float) -> type:
+    class GatewayHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes, Nagle would hold the body for the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def send(self, status: int, headers: Dict[str, str], body: bytes) -> None:
+            self.send_response(status)
+            for key, value in headers.items():
+                if key.lower() not in ('content-length', 'connection', 'transfer-encoding'):
+                    self.send_header(key, str(value))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def send_json(self, status: int, data: Any) -> None:
+            self.send(status, {'Content-Type': 'application/json'}, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+        def dispatch(self) -> None:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            if self.path.split('?', 1)[0] == METRICS_PATH:
+                self.send_json(200, {name: pool.metrics.snapshot() for name, pool in pools.items()})
+                return
+
+            name, event = build_event(self.command, self.path, dict(self.headers.items()), body, self.client_address[0])
+            pool = pools.get(name)
+            if pool is None:
+                self.send_json(404, {'error': f'Unknown function {name!r}', 'functions': list(pools)})
+                return
+
+            started = time.perf_counter()
+            pool.metrics.begin()
+            job_id, future = pool.submit(event)
+            try:
+                response, error, wait_ms, handler_ms = future.result(timeout=timeout)
+            except FutureTimeout:
+                pool.forget(job_id)
+                pool.metrics.end('504', (time.perf_counter() - started) * 1000)
+                self.send_json(504, {'error': f'{name} did not respond within {timeout:g}s'})
+                return
+            if error is not None or not isinstance(response, dict):
+                pool.metrics.end('502', (time.perf_counter() - started) * 1000, handler_ms, wait_ms)
+                self.send_json(502, {'error': error or 'Handler returned no response'})
+                return
+
+            headers = response.get('headers') or {}
+            payload = response.get('body') or ''
+            if response.get('isBase64Encoded'):
+                data = base64.b64decode(payload)
+            else:
+                data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload).encode('utf-8')
+            status = int(response.get('statusCode', 200))
+            self.send(status, headers, data)
+            pool.metrics.end(str(status), (time.perf_counter() - started) * 1000, handler_ms, wait_ms,
+                             headers.get('Server-Timing', ''))
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = do_HEAD = dispatch
+
+    return GatewayHandler
+
+
+def main() -> None:
+    names = function_names()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--functions', nargs='+', default=names, choices=names)
+    parser.add_argument('--processes', type=int, default=1, help='worker processes per function')
+    parser.add_argument('--threads', type=int, default=4, help='handler threads per worker process')
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds before a request gets 504')
+    args = parser.parse_args()
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    pools = {name: FunctionPool(name, args.processes, args.threads) for name in args.functions}
+    server = ThreadingHTTPServer((args.host, args.port), make_request_handler(pools, args.timeout))
+    server.daemon_threads = True
+    base = f'http://{args.host}:{server.server_address[1]}'
+    for name in args.functions:
+        print(f'{name:<24} {base}/{name}  ({args.processes} x {args.threads} threads)')
+    print(f"{'metrics':<24} {base}{METRICS_PATH}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for pool in pools.values():
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
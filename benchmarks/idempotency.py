@@ -0,0 +1,165 @@
+'''
+Duplicate suppression and admission control of submit-application.
+
+Duplicate bursts: every application is sent --copies times at once, the
+way double clicks and client retries arrive. Each copy either carries its
+own Idempotency-Key (every copy does the insert and queues an email, the
+previous behaviour) or the same key (one insert, the rest replay the
+original application_id). Reports rows written, emails queued and p50/p95.
+
+Admission: --flood threads submit distinct applications as fast as they
+can, waiting out Retry-After when shed, with admission control off and
+with a token bucket of --rate/--burst. Reports admitted/sec, shed
+requests and p95 of the admitted ones.
+
+    DATABASE_URL=postgresql://... python benchmarks/idempotency.py --applications 200 --copies 5
+
+Writes applications and removes them at the end.
+'''
+import argparse
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+from common import Context, load_handler, make_event, require_database
+from loadtest import percentile
+
+os.environ['ADMISSION_RATE'] = '0'
+
+MARKER = 'idempotency-benchmark'
+
+
+def application(serial: int) -> Dict[str, Any]:
+    return {
+        'application_type': 'applicant', 'name': 'Иван', 'surname': f'Дубликатов{serial}',
+        'email': f'dup{serial}@example.com', 'phone': '+79991234567',
+        'position': 'Backend Developer', 'experience': 3, 'cover_letter': MARKER,
+    }
+
+
+def submit(handler: Any, body: Dict[str, Any], key: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    response = handler(make_event('POST', body=body, headers={'Idempotency-Key': key}), Context('submit-application'))
+    return {'status': response['statusCode'], 'ms': (time.perf_counter() - started) * 1000,
+            'retry_after': int(response['headers'].get('Retry-After', 0))}
+
+
+def duplicate_bursts(handler: Any, applications: int, copies: int, shared_key: bool, offset: int) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    for serial in range(offset, offset + applications):
+        body = application(serial)
+        key = str(uuid.uuid4())
+
+        def send() -> None:
+            result = submit(handler, body, key if shared_key else str(uuid.uuid4()))
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=send) for _ in range(copies)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def flood(handler: Any, threads: int, duration: float, offset: int) -> List[Dict[str, Any]]:
+    stop = time.monotonic() + duration
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        samples = []
+        serial = offset + index * 1_000_000
+        while time.monotonic() < stop:
+            result = submit(handler, application(serial), str(uuid.uuid4()))
+            samples.append(result)
+            serial += 1
+            if result['retry_after']:
+                time.sleep(max(0.0, min(result['retry_after'], stop - time.monotonic())))
+        with lock:
+            results.extend(samples)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results
+
+
+def written(cur: Any) -> Dict[str, int]:
+    cur.execute('''
+        SELECT COUNT(DISTINCT a.id), COUNT(o.id)
+        FROM applications a LEFT JOIN email_outbox o ON o.application_id = a.id
+        WHERE a.cover_letter = %s
+    ''', (MARKER,))
+    applications, emails = cur.fetchone()
+    return {'applications': applications, 'emails': emails}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=200)
+    parser.add_argument('--copies', type=int, default=5)
+    parser.add_argument('--flood', type=int, default=16, help='threads submitting during the admission run')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--rate', type=float, default=50.0)
+    parser.add_argument('--burst', type=float, default=20.0)
+    args = parser.parse_args()
+
+    require_database()
+    os.environ.setdefault('DB_POOL_MAX_SIZE', str(max(args.copies, 4)))
+    handler = load_handler('submit-application')
+    import admission
+    import db
+
+    pool = db.get_pool()
+
+    def cleanup() -> None:
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('''
+                DELETE FROM email_outbox
+                WHERE application_id IN (SELECT id FROM applications WHERE cover_letter = %s)
+            ''', (MARKER,))
+            cur.execute('DELETE FROM applications WHERE cover_letter = %s', (MARKER,))
+            conn.commit()
+
+    def counts() -> Dict[str, int]:
+        with pool.connection() as conn, conn.cursor() as cur:
+            return written(cur)
+
+    cleanup()
+    try:
+        print(f'{args.applications} applications x {args.copies} concurrent copies')
+        print(f"  {'mode':<16} {'rows':>6} {'emails':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for offset, (mode, shared) in enumerate((('key per copy', False), ('shared key', True))):
+            results = duplicate_bursts(handler, args.applications, args.copies, shared, offset * args.applications)
+            if any(result['status'] != 200 for result in results):
+                raise RuntimeError(f"unexpected statuses: {sorted({result['status'] for result in results})}")
+            latencies = sorted(result['ms'] for result in results)
+            rows = counts()
+            cleanup()
+            print(f"  {mode:<16} {rows['applications']:>6} {rows['emails']:>7} "
+                  f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f}")
+
+        pool.max_size = 4
+        print(f'\n{args.flood} threads for {args.duration:.0f}s over a pool of {pool.max_size} connections')
+        print(f"  {'admission':<22} {'admitted/s':>10} {'shed':>7} {'p95 admitted ms':>16}")
+        for mode, bucket in (('off', None), (f'{args.rate:g}/s burst {args.burst:g}', admission.TokenBucket(args.rate, args.burst))):
+            admission._bucket = bucket
+            results = flood(handler, args.flood, args.duration, 10 ** 8)
+            admitted = sorted(result['ms'] for result in results if result['status'] == 200)
+            shed = sum(1 for result in results if result['status'] == 429)
+            cleanup()
+            print(f"  {mode:<22} {len(admitted) / args.duration:>10.1f} {shed:>7} {percentile(admitted, 0.95):>16.2f}")
+    finally:
+        admission._bucket = None
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
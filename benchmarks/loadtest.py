@@ -0,0 +1,361 @@
+'''
+Concurrent load test of the functions, loaded in-process the way the
+runtime loads them. Events come from each function's tests.json plus
+synthetic generators. With --reset the database is reseeded first (see
+seed.py), otherwise its current contents are used. Mail goes to the local
+SMTP sink. Each function runs in its own worker processes (functions
+share module names), with --concurrency threads each. Prints
+p50/p95/p99 latency and req/sec per route, writes the result as JSON and
+optionally compares it with a baseline result.
+
+    DATABASE_URL=postgresql://... python benchmarks/loadtest.py --reset --duration 20 --out before.json
+    DATABASE_URL=postgresql://... python benchmarks/loadtest.py --duration 20 --baseline before.json
+
+With --gateway the same traffic goes over HTTP to a running gateway.py
+instead of in-process handlers; the gateway's environment then decides
+pool sizes, SMTP and admission control, and no SMTP sink is started.
+
+Writes into the target database, use a disposable one.
+'''
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from common import BACKEND, Context, load_handler, make_event, require_database
+from seed import add_reset_argument
+
+FUNCTIONS = ('department', 'submit-application', 'send-application-email')
+
+
+class Route:
+    '''One kind of request: builds a fresh event per call and knows the status it should get'''
+
+    def __init__(self, name: str, make: Callable[[random.Random], Dict[str, Any]], expected: Optional[int] = None, weight: float = 1.0):
+        self.name = name
+        self.make = make
+        self.expected = expected
+        self.weight = weight
+
+
+def routes_from_tests(function: str) -> List[Route]:
+    '''Replay every case of backend/<function>/tests.json'''
+    tests = json.loads((BACKEND / function / 'tests.json').read_text())['tests']
+    routes = []
+    for test in tests:
+        query = dict(parse_qsl(urlsplit(test.get('path', '/')).query, keep_blank_values=True))
+        event = make_event(test['method'], query, test.get('body'), test.get('headers'))
+        routes.append(Route(f"tests.json: {test['name']}", lambda rng, event=event: dict(event), test.get('expectedStatus')))
+    return routes
+
+
+def synthetic_routes(function: str, sizes: Dict[str, int]) -> List[Route]:
+    '''Randomized traffic shaped like the frontend's, weighted towards reads'''
+    serial = count()
+
+    if function == 'department':
+        def group(rng: random.Random) -> str:
+            return str(rng.randint(1, max(sizes['groups'], 1)))
+
+        return [
+            Route('GET groups', lambda rng: make_event('GET', {'resource': 'groups'}), 200, 4),
+            Route('GET employees page', lambda rng: make_event('GET', {'resource': 'employees', 'group_id': group(rng)}), 200, 4),
+            Route('GET tasks page', lambda rng: make_event('GET', {'resource': 'tasks', 'group_id': group(rng)}), 200, 4),
+            Route('GET tasks first page', lambda rng: make_event('GET', {'resource': 'tasks'}), 200, 2),
+            Route('GET stats', lambda rng: make_event('GET', {'resource': 'stats'}), 200, 2),
+            Route('GET group stats', lambda rng: make_event('GET', {'resource': 'stats', 'group_id': group(rng)}), 200, 2),
+            Route('POST task', lambda rng: make_event('POST', {'resource': 'tasks'}, {
+                'group_id': int(group(rng)), 'title': f'Нагрузочная задача {next(serial)}', 'priority': 'medium',
+            }), 200, 1),
+            Route('PUT task status', lambda rng: make_event('PUT', {'resource': 'tasks'}, {
+                'id': rng.randint(1, max(sizes['tasks'], 1)), 'status': rng.choice(['todo', 'in_progress', 'completed']),
+            }), 200, 1),
+        ]
+
+    if function == 'submit-application':
+        def applicant(rng: random.Random) -> Dict[str, Any]:
+            return make_event('POST', body={
+                'application_type': 'applicant', 'name': 'Иван', 'surname': f'Нагрузкин{next(serial)}',
+                'email': f'load{rng.randrange(10 ** 9)}@example.com', 'phone': '+79991234567',
+                'position': 'Backend Developer', 'experience': rng.randint(0, 15), 'cover_letter': 'Нагрузочный тест',
+            })
+
+        def student(rng: random.Random) -> Dict[str, Any]:
+            return make_event('POST', body={
+                'application_type': 'student', 'name': 'Мария', 'surname': f'Нагрузкина{next(serial)}',
+                'email': f'load{rng.randrange(10 ** 9)}@example.com', 'phone': '+79991234567',
+                'university': 'МГУ', 'course': rng.randint(1, 6), 'specialty': 'Информатика',
+                'direction': 'Frontend', 'motivation_letter': 'Нагрузочный тест',
+            })
+
+        return [
+            Route('POST applicant', applicant, 200, 2),
+            Route('POST student', student, 200, 2),
+            Route('POST invalid email', lambda rng: make_event('POST', body={
+                'application_type': 'applicant', 'name': 'Иван', 'surname': 'Иванов', 'email': 'not-an-email',
+            }), 400, 1),
+        ]
+
+    def recipient(rng: random.Random) -> Dict[str, Any]:
+        return {'name': 'Иван', 'surname': 'Иванов', 'email': f'load{rng.randrange(10 ** 9)}@example.com',
+                'application_type': rng.choice(['applicant', 'student'])}
+
+    return [
+        Route('POST single email', lambda rng: make_event('POST', body=recipient(rng)), 200, 4),
+        Route('POST batch of 10', lambda rng: make_event('POST', body=[recipient(rng) for _ in range(10)]), 200, 1),
+    ]
+
+
+def gateway_handler(url: str, function: str) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    '''Stand-in for handler() that sends the event to gateway.py over a keep-alive connection per thread'''
+    parts = urlsplit(url)
+    local = threading.local()
+
+    def send(method: str, path: str, body: Optional[bytes], headers: Dict[str, str]) -> Dict[str, Any]:
+        if getattr(local, 'conn', None) is None:
+            local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        response = None
+        try:
+            local.conn.request(method, path, body, headers)
+            response = local.conn.getresponse()
+            response.read()
+        finally:
+            if response is None:
+                local.conn.close()
+                local.conn = None
+        return {'statusCode': response.status}
+
+    def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        query = urlencode(event['queryStringParameters'])
+        path = f'{parts.path.rstrip("/")}/{function}' + (f'?{query}' if query else '')
+        body = event['body'].encode('utf-8') if 'body' in event else None
+        try:
+            return send(event['httpMethod'], path, body, event['headers'])
+        except (http.client.HTTPException, ConnectionError):
+            # The gateway may have dropped an idle keep-alive connection, retry once on a fresh one
+            return send(event['httpMethod'], path, body, event['headers'])
+
+    return handler
+
+
+def run_worker(function: str, duration: float, warmup: float, concurrency: int, sizes: Dict[str, int], seed: int,
+               gateway: Optional[str] = None) -> Dict[str, Any]:
+    '''Child process: drive one function from `concurrency` threads, return raw latencies per route'''
+    handler = gateway_handler(gateway, function) if gateway else load_handler(function)
+    routes = routes_from_tests(function) + synthetic_routes(function, sizes)
+    weights = [route.weight for route in routes]
+    results = {route.name: {'latencies': [], 'statuses': {}, 'unexpected': 0} for route in routes}
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    def drive(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        while True:
+            route = rng.choices(routes, weights)[0]
+            event = route.make(rng)
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            try:
+                status = str(handler(event, Context(function))['statusCode'])
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            if started < measure_from:
+                continue
+            with lock:
+                result = results[route.name]
+                result['latencies'].append(round(elapsed * 1000, 3))
+                result['statuses'][status] = result['statuses'].get(status, 0) + 1
+                if route.expected is not None and status != str(route.expected):
+                    result['unexpected'] += 1
+
+    threads = [threading.Thread(target=drive, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    '''Nearest-rank percentile of sorted values'''
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(raw: Dict[str, Dict[str, Any]], duration: float) -> Dict[str, Dict[str, Any]]:
+    routes = {}
+    for name, result in sorted(raw.items()):
+        latencies = sorted(result['latencies'])
+        if not latencies:
+            continue
+        routes[name] = {
+            'count': len(latencies),
+            'rps': round(len(latencies) / duration, 1),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': latencies[-1],
+            'statuses': result['statuses'],
+            'unexpected': result['unexpected'],
+        }
+    return routes
+
+
+def print_table(routes: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'route':60s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}  statuses")
+    for name, stats in routes.items():
+        statuses = ' '.join(f'{status}:{number}' for status, number in sorted(stats['statuses'].items()))
+        flag = f"  unexpected:{stats['unexpected']}" if stats['unexpected'] else ''
+        print(f"{name[:60]:60s} {stats['rps']:8.1f} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f}  {statuses}{flag}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    '''
+    Print per-route deltas against a baseline result, return the routes that
+    regressed beyond tolerance. p95 growth below min_delta_ms is ignored so
+    sub-millisecond routes do not flap.
+    '''
+    regressions = []
+    print(f"\n{'route':60s} {'req/s':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for name, stats in current['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        deltas = {key: (stats[key] - before[key]) / before[key] if before[key] else 0.0
+                  for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')}
+        print(f"{name[:60]:60s} " + ' '.join(f'{deltas[key]:+9.1%}' for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')))
+        slower = deltas['p95_ms'] > tolerance and stats['p95_ms'] - before['p95_ms'] > min_delta_ms
+        if deltas['rps'] < -tolerance or slower:
+            regressions.append(f"{name}: req/s {deltas['rps']:+.1%}, p95 {deltas['p95_ms']:+.1%}")
+    return regressions
+
+
+def spawn(function: str, args: argparse.Namespace, sizes: Dict[str, int], seed: int, env: Dict[str, str]) -> subprocess.Popen:
+    command = [
+        sys.executable, __file__, '--worker', function,
+        '--duration', str(args.duration), '--warmup', str(args.warmup),
+        '--concurrency', str(args.concurrency), '--seed', str(seed),
+        '--sizes', json.dumps(sizes),
+    ]
+    if args.gateway:
+        command += ['--gateway', args.gateway]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, env=env, cwd=Path(__file__).parent, text=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--functions', nargs='+', default=list(FUNCTIONS), choices=FUNCTIONS)
+    parser.add_argument('--duration', type=float, default=15.0, help='measured seconds per run')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of unmeasured traffic first')
+    parser.add_argument('--concurrency', type=int, default=4, help='threads per worker process')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes per function')
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--applications', type=int, default=10000)
+    add_reset_argument(parser)
+    parser.add_argument('--smtp-latency-ms', type=float, default=2.0)
+    parser.add_argument('--out', help='write the result JSON here')
+    parser.add_argument('--baseline', help='result JSON of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed req/s drop or p95 growth per route')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore p95 growth smaller than this')
+    parser.add_argument('--gateway', help='base URL of a running gateway.py to send the traffic to')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--sizes', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args.duration, args.warmup, args.concurrency, json.loads(args.sizes), args.seed,
+                            args.gateway)
+        print(json.dumps(result))
+        return
+
+    dsn = require_database()
+    sizes = {'groups': args.groups, 'employees': args.employees, 'tasks': args.tasks, 'applications': args.applications}
+    if args.reset:
+        import psycopg2
+        from seed import seed_database
+        conn = psycopg2.connect(dsn)
+        seed_database(conn, **sizes)
+        conn.close()
+
+    env = dict(os.environ, REQUEST_LOG='false', DB_POOL_MAX_SIZE=str(args.concurrency))
+    # Measure the handlers, not submit-application's admission control, unless asked to
+    env.setdefault('ADMISSION_RATE', '0')
+    sink = None
+    if 'send-application-email' in args.functions and not args.gateway:
+        from smtp_sink import start_sink
+        sink = start_sink(latency=args.smtp_latency_ms / 1000)
+        env.update({
+            'SMTP_HOST': '127.0.0.1',
+            'SMTP_PORT': str(sink.server_address[1]),
+            'SMTP_USER': 'load@example.com',
+            'SMTP_PASSWORD': 'load',
+            'SMTP_STARTTLS': 'false',
+        })
+
+    workers = [
+        (function, spawn(function, args, sizes, seed, env))
+        for function in args.functions
+        for seed in range(args.processes)
+    ]
+    raw: Dict[str, Dict[str, Any]] = {}
+    for function, process in workers:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            sys.exit(f'{function} worker failed')
+        for name, result in json.loads(output.strip().splitlines()[-1]).items():
+            merged = raw.setdefault(f'{function} {name}', {'latencies': [], 'statuses': {}, 'unexpected': 0})
+            merged['latencies'].extend(result['latencies'])
+            merged['unexpected'] += result['unexpected']
+            for status, number in result['statuses'].items():
+                merged['statuses'][status] = merged['statuses'].get(status, 0) + number
+
+    current = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'functions': args.functions,
+            'duration': args.duration,
+            'concurrency': args.concurrency,
+            'processes': args.processes,
+            'gateway': args.gateway,
+            'sizes': sizes,
+            'smtp_latency_ms': args.smtp_latency_ms,
+        },
+        'routes': summarize(raw, args.duration),
+    }
+    print_table(current['routes'])
+    if sink is not None:
+        print(f'\nsmtp sink: {sink.connections} connections, {sink.messages} messages')
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(current, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        regressions = compare(current, json.loads(Path(args.baseline).read_text()), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print('\nregressed beyond tolerance:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+'''
+End-to-end check and throughput of the email-outbox drain. Queues
+--emails confirmation rows the way submit-application does, then:
+
+1. drains with SMTP unreachable: every row must be rescheduled with
+   backoff (retried, attempts 1) and nothing delivered;
+2. makes the rows due again and drains into the local SMTP sink: every
+   row must end up sent and the sink must have received each message.
+
+Prints msg/sec of the second drain and exits non-zero when a check fails.
+
+    DATABASE_URL=postgresql://... python benchmarks/outbox_drain.py --emails 500 --smtp-latency-ms 2
+
+Other pending outbox rows in the database are drained too and counted in
+the totals. Queued rows and their applications are removed at the end.
+'''
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict, List
+
+from common import Context, load_handler, require_database
+from smtp_sink import start_sink
+
+MARKER = 'outbox-drain-benchmark'
+
+
+def free_port() -> int:
+    '''A port nothing listens on, for the unreachable SMTP run'''
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def drain(handler: Any, batch_size: int) -> Dict[str, int]:
+    '''Invoke the drain the way the timer does until a run claims nothing'''
+    totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        response = handler({'batch_size': batch_size}, Context('email-outbox'))
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"drain failed: {response['statusCode']} {response['body']}")
+        stats = json.loads(response['body'])
+        for key, value in stats.items():
+            totals[key] += value
+        if stats['claimed'] == 0:
+            return totals
+
+
+def queued_states(cur: Any) -> Dict[str, int]:
+    cur.execute('''
+        SELECT o.status || ':' || o.attempts, COUNT(*)
+        FROM email_outbox o JOIN applications a ON a.id = o.application_id
+        WHERE a.cover_letter = %s
+        GROUP BY 1
+    ''', (MARKER,))
+    return dict(cur.fetchall())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--emails', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--smtp-latency-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    require_database()
+    sink = start_sink(latency=args.smtp_latency_ms / 1000)
+    os.environ.update({
+        'SMTP_HOST': '127.0.0.1',
+        'SMTP_USER': 'outbox@example.com',
+        'SMTP_PASSWORD': 'outbox',
+        'SMTP_STARTTLS': 'false',
+    })
+    handler = load_handler('email-outbox')
+    from db import get_pool
+
+    pool = get_pool()
+    failures: List[str] = []
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute('''
+            WITH inserted AS (
+                INSERT INTO applications (application_type, name, surname, email, phone, position, cover_letter)
+                SELECT 'applicant', 'Иван', 'Очередин' || n, 'outbox' || n || '@example.com', '+79991234567',
+                       'Backend-разработчик', %s
+                FROM generate_series(1, %s) AS n
+                RETURNING id, name, surname, email
+            )
+            INSERT INTO email_outbox (application_id, application_type, recipient, name, surname)
+            SELECT id, 'applicant', email, name, surname FROM inserted
+        ''', (MARKER, args.emails))
+        conn.commit()
+
+    try:
+        os.environ['SMTP_PORT'] = str(free_port())
+        down = drain(handler, args.batch_size)
+        with pool.connection() as conn, conn.cursor() as cur:
+            states = queued_states(cur)
+            print(f"SMTP unreachable   claimed {down['claimed']}  retried {down['retried']}  states {states}")
+            if states != {'pending:1': args.emails} or sink.messages:
+                failures.append(f'unreachable SMTP: expected {args.emails} rows pending:1 and no delivery, got {states}')
+            cur.execute('''
+                UPDATE email_outbox SET next_attempt_at = CURRENT_TIMESTAMP
+                WHERE status = 'pending' AND application_id IN (SELECT id FROM applications WHERE cover_letter = %s)
+            ''', (MARKER,))
+            conn.commit()
+
+        os.environ['SMTP_PORT'] = str(sink.server_address[1])
+        started = time.perf_counter()
+        up = drain(handler, args.batch_size)
+        elapsed = time.perf_counter() - started
+        with pool.connection() as conn, conn.cursor() as cur:
+            states = queued_states(cur)
+        print(f"SMTP sink          claimed {up['claimed']}  sent {up['sent']}  states {states}  "
+              f"{up['sent'] / elapsed:.1f} msg/s over {sink.connections} connections")
+        if states != {'sent:2': args.emails}:
+            failures.append(f'sink: expected {args.emails} rows sent:2, got {states}')
+        if sink.messages != up['sent']:
+            failures.append(f"sink received {sink.messages} messages, drain reported {up['sent']} sent")
+    finally:
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('''
+                DELETE FROM email_outbox
+                WHERE application_id IN (SELECT id FROM applications WHERE cover_letter = %s)
+            ''', (MARKER,))
+            cur.execute('DELETE FROM applications WHERE cover_letter = %s', (MARKER,))
+            conn.commit()
+
+    if failures:
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+'''
+Latency of the department handler's hot requests with every statement
+sent as SQL text (PREPARED_STATEMENTS=false) against the statement
+registry, which prepares once per connection and then only sends EXECUTE.
+Both modes run the same statements (sentinel keyset bounds, canonical
+CASE-shaped UPDATEs), so the difference is the parse and plan work that
+PREPARE saves, not a comparison with the older per-request f-string SQL.
+Reports the p50 of the whole request and of its db.query time from
+Server-Timing, then a short pass with every request EXPLAIN-sampled for
+the mean planning time per statement in each mode, the registry counters
+and the generic/custom plan counts Postgres kept for the session.
+
+    DATABASE_URL=postgresql://... python benchmarks/prepared_statements.py --requests 2000
+
+Expects seeded data (benchmarks/seed.py). Writes tasks and removes them
+at the end. The response cache is disabled so every read reaches Postgres.
+'''
+import argparse
+import os
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List
+
+from common import Context, load_handler, make_event, require_database
+from loadtest import percentile
+
+os.environ['CACHE_MAX_ENTRIES'] = '0'
+os.environ.setdefault('DB_POOL_MAX_SIZE', '1')
+
+MARKER = 'prepared-statements-benchmark'
+DB_QUERY = re.compile(r'db\.query;dur=([\d.]+)')
+
+
+def scenarios(groups: int, tasks: List[int]) -> Dict[str, Callable[[random.Random], Dict[str, Any]]]:
+    def group(rng: random.Random) -> str:
+        return str(rng.randint(1, groups))
+
+    return {
+        'GET groups': lambda rng: make_event('GET', {'resource': 'groups'}),
+        'GET employees page': lambda rng: make_event('GET', {'resource': 'employees', 'group_id': group(rng), 'limit': '20'}),
+        'GET tasks page': lambda rng: make_event('GET', {'resource': 'tasks', 'group_id': group(rng), 'limit': '20'}),
+        'POST task': lambda rng: make_event('POST', {'resource': 'tasks'}, {
+            'group_id': int(group(rng)), 'title': MARKER, 'priority': 'medium',
+        }),
+        'PUT task status': lambda rng: make_event('PUT', {'resource': 'tasks'}, {
+            'id': rng.choice(tasks), 'status': rng.choice(['todo', 'in_progress', 'completed']),
+        }),
+    }
+
+
+def measure(handler: Any, build: Callable[[random.Random], Dict[str, Any]], requests: int, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    for _ in range(min(requests // 10, 50)):
+        handler(build(rng), Context('department'))
+    totals: List[float] = []
+    db_times: List[float] = []
+    for _ in range(requests):
+        event = build(rng)
+        started = time.perf_counter()
+        response = handler(event, Context('department'))
+        totals.append((time.perf_counter() - started) * 1000)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"request failed: {response['statusCode']} {response['body']}")
+        db_times.append(sum(float(value) for value in DB_QUERY.findall(response['headers']['Server-Timing'])))
+    return {'total': percentile(sorted(totals), 0.5), 'db': percentile(sorted(db_times), 0.5)}
+
+
+def planning_times(handler: Any, build: Callable[[random.Random], Dict[str, Any]], requests: int, seed: int) -> None:
+    '''Run requests with EXPLAIN sampling forced on, statements record the planning time of each sample'''
+    import timing
+
+    rate, timing.EXPLAIN_SAMPLE_RATE = timing.EXPLAIN_SAMPLE_RATE, 1.0
+    try:
+        rng = random.Random(seed)
+        for _ in range(requests):
+            handler(build(rng), Context('department'))
+    finally:
+        timing.EXPLAIN_SAMPLE_RATE = rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--plan-samples', type=int, default=50, help='EXPLAIN-sampled requests per scenario and mode')
+    args = parser.parse_args()
+
+    require_database()
+    handler = load_handler('department')
+    import db
+    import statements
+
+    pool = db.get_pool()
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT COUNT(*) FROM groups')
+        groups = max(cur.fetchone()[0], 1)
+        cur.execute('SELECT id FROM tasks ORDER BY id LIMIT 1000')
+        tasks = [row[0] for row in cur.fetchall()]
+    if not tasks:
+        raise SystemExit('No tasks found, seed the database first (benchmarks/seed.py)')
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    planning: Dict[str, Dict[str, float]] = {}
+    try:
+        for mode, enabled in (('SQL text', False), ('prepared', True)):
+            statements.PREPARED_STATEMENTS = enabled
+            for name, build in scenarios(groups, tasks).items():
+                results.setdefault(name, {})[mode] = measure(handler, build, args.requests, seed=len(name))
+            before = statements.statement_stats()
+            for name, build in scenarios(groups, tasks).items():
+                planning_times(handler, build, args.plan_samples, seed=len(name))
+            for name, stats in statements.statement_stats().items():
+                samples = stats['plan_samples'] - before[name]['plan_samples']
+                if samples:
+                    planning.setdefault(name, {})[mode] = (stats['plan_ms'] - before[name]['plan_ms']) / samples
+    finally:
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('DELETE FROM tasks WHERE title = %s', (MARKER,))
+            conn.commit()
+
+    print(f"{'request':<20} {'text p50':>10} {'prep p50':>10} {'text db':>9} {'prep db':>9}  ms")
+    for name, modes in results.items():
+        text, prepared = modes['SQL text'], modes['prepared']
+        print(f"{name:<20} {text['total']:>10.3f} {prepared['total']:>10.3f} {text['db']:>9.3f} {prepared['db']:>9.3f}")
+
+    print(f"\n{'statement':<26} {'text plan':>10} {'prep plan':>10}  ms per EXECUTE, EXPLAIN-sampled")
+    for name, modes in planning.items():
+        print(f"{name:<26} {modes.get('SQL text', 0.0):>10.3f} {modes.get('prepared', 0.0):>10.3f}")
+
+    print('\nstatement registry')
+    with pool.connection() as conn, conn.cursor() as cur:
+        plans = statements.plan_counts(cur)
+    for name, stats in statements.statement_stats().items():
+        if stats['executions']:
+            counts = plans.get(name, {})
+            print(f"  {name:<26} executions {stats['executions']:>6}  prepares {stats['prepares']}  "
+                  f"parse/analyze {stats['prepare_ms']:.2f} ms  generic plans {counts.get('generic_plans', 0)}  "
+                  f"custom plans {counts.get('custom_plans', 0)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+'''
+Department listing reads competing with application inserts, with every
+read on the primary against reads routed to DATABASE_READ_URL. Reports
+p50/p95 of the reads and of the inserts, and the router counters.
+
+    DATABASE_URL=postgresql://...primary DATABASE_READ_URL=postgresql://...standby \
+        python benchmarks/read_routing.py --duration 10 --readers 4
+
+DATABASE_READ_URL may be a streaming standby of DATABASE_URL or, as a
+single-instance stand-in, the same database. The response cache is
+disabled so every read reaches Postgres. Inserted applications are
+removed at the end.
+'''
+import argparse
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+from common import Context, load_handler, make_event, require_database
+from loadtest import percentile
+
+os.environ['CACHE_MAX_ENTRIES'] = '0'
+
+MARKER = 'read-routing-benchmark'
+
+
+def read_event(rng: random.Random, groups: int) -> Dict[str, Any]:
+    if rng.random() < 0.3:
+        return make_event('GET', {'resource': 'stats', 'group_id': str(rng.randint(1, groups))})
+    return make_event('GET', {'resource': 'tasks', 'group_id': str(rng.randint(1, groups)), 'limit': '200'})
+
+
+def run(handler: Any, dsn: str, duration: float, readers: int, groups: int) -> Dict[str, List[float]]:
+    import psycopg2
+
+    stop = time.monotonic() + duration
+    reads: List[float] = []
+    writes: List[float] = []
+    lock = threading.Lock()
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        samples = []
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            response = handler(read_event(rng, groups), Context('department'))
+            if response['statusCode'] != 200:
+                raise RuntimeError(f"read failed: {response['statusCode']} {response['body']}")
+            samples.append((time.perf_counter() - started) * 1000)
+        with lock:
+            reads.extend(samples)
+
+    def writer() -> None:
+        conn = psycopg2.connect(dsn)
+        with conn.cursor() as cur:
+            while time.monotonic() < stop:
+                started = time.perf_counter()
+                cur.execute('''
+                    INSERT INTO applications (application_type, name, surname, email, phone, position, cover_letter)
+                    VALUES ('applicant', 'Иван', 'Иванов', 'load@example.com', '+79991234567', 'Backend-разработчик', %s)
+                ''', (MARKER,))
+                conn.commit()
+                writes.append((time.perf_counter() - started) * 1000)
+        conn.close()
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'reads': sorted(reads), 'writes': sorted(writes)}
+
+
+def report(label: str, samples: List[float], duration: float) -> None:
+    print(f'  {label:<8} {len(samples) / duration:8.1f}/s  p50 {percentile(samples, 0.5):8.2f} ms  '
+          f'p95 {percentile(samples, 0.95):8.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    dsn = require_database()
+    read_dsn = os.environ.get('DATABASE_READ_URL')
+    if not read_dsn:
+        raise SystemExit('DATABASE_READ_URL must point at a standby of DATABASE_URL or the same database')
+    handler = load_handler('department')
+    import db
+
+    primary = db.get_pool()
+    primary.max_size = args.readers
+    replica = db.ConnectionPool(read_dsn, max_size=args.readers, target='replica')
+    with primary.connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT COUNT(*) FROM groups')
+        groups = max(cur.fetchone()[0], 1)
+
+    try:
+        for mode, router in (('primary', db.ReadRouter(primary)), ('replica', db.ReadRouter(primary, replica))):
+            db._router = router
+            result = run(handler, dsn, args.duration, args.readers, groups)
+            print(f'reads on {mode}')
+            report('reads', result['reads'], args.duration)
+            report('inserts', result['writes'], args.duration)
+            stats = router.stats()
+            print(f"  routed   primary {stats['primary_reads']}  replica {stats['replica_reads']}  "
+                  f"stale {stats['fallback_stale']}  unavailable {stats['fallback_unavailable']}")
+    finally:
+        with primary.connection() as conn, conn.cursor() as cur:
+            cur.execute('DELETE FROM applications WHERE cover_letter = %s', (MARKER,))
+            conn.commit()
+
+
+if __name__ == '__main__':
+    main()
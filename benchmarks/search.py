@@ -0,0 +1,101 @@
+'''
+Latency of application search at 100k+ rows: an ILIKE scan over the
+letter and profile columns collecting every match, as any ranking on top
+of it would have to (what was possible before), against the
+indexed full-text search of the applications function, first and
+follow-up pages, and the trigram name lookup when pg_trgm is installed
+(V0011 skips it where the server lacks the extension and ?name= then
+answers 501).
+
+    DATABASE_URL=postgresql://... python benchmarks/search.py --reset --applications 100000 --runs 30
+
+With --reset the database is truncated and reseeded with --applications
+rows by benchmarks/seed.py (it must look disposable); the search terms
+and names match that synthetic data, so without it the database should
+already hold a seeded set.
+'''
+import argparse
+import json
+import os
+import time
+from typing import Any, Callable, List
+
+from common import Context, load_handler, make_event, require_database
+from loadtest import percentile
+from seed import add_reset_argument, seed_database
+
+TOKEN = 'benchmark-search-token'
+
+TERMS = ['тестирование', 'python микросервисы', '"машинным обучением"', 'дашборды -статистику', 'алгоритмы']
+NAMES = ['Фамилия4217', 'Имя 9001 Фамлия', 'Фамилия77']
+
+ILIKE = '''
+    SELECT id FROM applications
+    WHERE cover_letter ILIKE %(pattern)s OR motivation_letter ILIKE %(pattern)s OR position ILIKE %(pattern)s
+       OR university ILIKE %(pattern)s OR specialty ILIKE %(pattern)s
+'''
+
+
+def timings(call: Callable[[], Any], runs: int) -> List[float]:
+    call()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)
+
+
+def report(label: str, samples: List[float]) -> None:
+    print(f'{label:<44} p50 {percentile(samples, 0.5):8.2f} ms  p95 {percentile(samples, 0.95):8.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=30)
+    add_reset_argument(parser)
+    args = parser.parse_args()
+
+    import psycopg2
+    conn = psycopg2.connect(require_database())
+    if args.reset:
+        seed_database(conn, groups=1, employees=0, tasks=0, applications=args.applications)
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        trigrams = cur.fetchone() is not None
+    conn.commit()
+
+    os.environ['EXPORT_TOKEN'] = TOKEN
+    handler = load_handler('applications')
+
+    def search(params: dict) -> dict:
+        response = handler(make_event('GET', params, headers={'X-Export-Token': TOKEN}), Context('applications'))
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"search failed: {response['statusCode']} {response['body']}")
+        return json.loads(response['body'])
+
+    def ilike(term: str) -> None:
+        with conn.cursor() as cur:
+            cur.execute(ILIKE, {'pattern': f'%{term}%'})
+            cur.fetchall()
+        conn.rollback()
+
+    for term in TERMS:
+        print(f'\n{term}')
+        report('  ILIKE scan', timings(lambda: ilike(term.strip('"').split(' -')[0]), args.runs))
+        report('  full-text, first page', timings(lambda: search({'q': term}), args.runs))
+        cursor = search({'q': term})['next_cursor']
+        if cursor:
+            report('  full-text, second page', timings(lambda: search({'q': term, 'cursor': cursor}), args.runs))
+
+    if not trigrams:
+        print('\npg_trgm is not installed, skipping name lookups')
+        return
+    for name in NAMES:
+        print(f'\n{name}')
+        report('  fuzzy name lookup', timings(lambda: search({'name': name}), args.runs))
+
+
+if __name__ == '__main__':
+    main()
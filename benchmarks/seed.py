@@ -0,0 +1,139 @@
+'''
+Reset a disposable database and fill it with synthetic department data and
+applications, sized for load tests. Every table the functions write to is
+truncated first.
+
+    DATABASE_URL=postgresql://... python benchmarks/seed.py --groups 20 --employees 2000 --tasks 50000 --applications 20000
+
+Refuses to touch a database that does not look disposable: its name has to
+contain one of DISPOSABLE_NAMES, or it has to be marked with
+
+    COMMENT ON DATABASE <name> IS 'disposable';
+
+Benchmarks that seed do so only when given --reset.
+'''
+import argparse
+from typing import Any, Dict
+
+from common import require_database
+
+TABLES = ('email_outbox', 'application_submissions', 'applications', 'tasks', 'employees', 'groups', 'cache_versions',
+          'sync_tombstones')
+DISPOSABLE_NAMES = ('bench', 'test', 'scratch', 'tmp')
+DISPOSABLE_MARKER = 'disposable'
+
+
+def require_disposable(conn: Any) -> str:
+    '''Name of the connected database, exits unless its name or comment marks it disposable'''
+    with conn.cursor() as cur:
+        cur.execute('''
+            SELECT datname, shobj_description(oid, 'pg_database')
+            FROM pg_database WHERE datname = current_database()
+        ''')
+        name, comment = cur.fetchone()
+    conn.rollback()
+    if any(part in name.lower() for part in DISPOSABLE_NAMES) or (comment or '').strip().lower() == DISPOSABLE_MARKER:
+        return name
+    raise SystemExit(f"Refusing to truncate database {name!r}: its name does not contain any of "
+                     f"{', '.join(DISPOSABLE_NAMES)} and it is not marked with "
+                     f"COMMENT ON DATABASE {name} IS '{DISPOSABLE_MARKER}'")
+
+
+def add_reset_argument(parser: Any) -> None:
+    parser.add_argument('--reset', action='store_true',
+                        help='truncate and reseed the database first (see seed.py), it must look disposable')
+
+
+def seed_database(conn: Any, groups: int, employees: int, tasks: int, applications: int) -> Dict[str, int]:
+    '''
+    Bulk insert with generate_series. Row triggers are suspended while
+    filling employees and tasks and the group counters are rebuilt once at
+    the end.
+    '''
+    require_disposable(conn)
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        cur.execute('ALTER TABLE employees DISABLE TRIGGER USER')
+        cur.execute('ALTER TABLE tasks DISABLE TRIGGER USER')
+
+        cur.execute('''
+            INSERT INTO groups (name, description)
+            SELECT 'Группа ' || i, 'Синтетическая группа ' || i
+            FROM generate_series(1, %s) AS i
+        ''', (groups,))
+        cur.execute('''
+            INSERT INTO employees (group_id, name, position, email, phone, status, hired_date)
+            SELECT 1 + i %% %s, 'Сотрудник ' || i,
+                   CASE WHEN i %% 10 = 0 THEN 'Руководитель группы' ELSE 'Специалист' END,
+                   'employee' || i || '@example.com', '+7999' || lpad(i::text, 7, '0'),
+                   'active', CURRENT_DATE - (i %% 1000)
+            FROM generate_series(1, %s) AS i
+        ''', (groups, employees))
+        cur.execute('''
+            INSERT INTO tasks (group_id, employee_id, title, description, status, priority, due_date, created_at, completed_at)
+            SELECT 1 + i %% %s, CASE WHEN %s > 0 THEN 1 + i %% %s END,
+                   'Задача ' || i, 'Описание задачи ' || i,
+                   (ARRAY['todo', 'in_progress', 'completed'])[1 + i %% 3],
+                   (ARRAY['low', 'medium', 'high'])[1 + i %% 3],
+                   CURRENT_DATE + (i %% 60),
+                   CURRENT_TIMESTAMP - i * INTERVAL '1 minute',
+                   CASE WHEN i %% 3 = 2 THEN CURRENT_TIMESTAMP - i * INTERVAL '30 seconds' END
+            FROM generate_series(1, %s) AS i
+        ''', (groups, employees, max(employees, 1), tasks))
+        cur.execute('''
+            INSERT INTO applications
+                (application_type, name, surname, email, phone, position, experience, cover_letter,
+                 university, course, specialty, direction, motivation_letter, created_at)
+            SELECT CASE WHEN i %% 2 = 0 THEN 'applicant' ELSE 'student' END,
+                   'Имя' || i, 'Фамилия' || i, 'applicant' || i || '@example.com', '+7999' || lpad(i::text, 7, '0'),
+                   CASE WHEN i %% 2 = 0 THEN (ARRAY['Backend-разработчик', 'Frontend-разработчик', 'Аналитик данных',
+                                                     'Тестировщик', 'DevOps-инженер', 'Менеджер продукта'])[1 + i / 2 %% 6] END,
+                   CASE WHEN i %% 2 = 0 THEN i %% 15 END,
+                   CASE WHEN i %% 2 = 0 THEN 'Сопроводительное письмо ' || i || '. ' || (ARRAY[
+                       'Разрабатывал микросервисы на Python и PostgreSQL.',
+                       'Занимался автоматизацией тестирования и нагрузочными тестами.',
+                       'Строил дашборды и отчёты, знаю SQL и статистику.',
+                       'Настраивал Kubernetes, мониторинг и CI/CD.',
+                       'Вёл продукт от исследования пользователей до релиза.',
+                       'Верстал интерфейсы на React и TypeScript.'])[1 + i / 2 %% 6] END,
+                   CASE WHEN i %% 2 = 1 THEN (ARRAY['МГУ', 'МФТИ', 'ВШЭ', 'ИТМО', 'СПбГУ'])[1 + i / 2 %% 5] END,
+                   CASE WHEN i %% 2 = 1 THEN 1 + i %% 6 END,
+                   CASE WHEN i %% 2 = 1 THEN (ARRAY['Информатика', 'Прикладная математика', 'Программная инженерия',
+                                                     'Анализ данных'])[1 + i / 2 %% 4] END,
+                   CASE WHEN i %% 2 = 1 THEN (ARRAY['Frontend', 'Backend', 'Аналитика', 'Тестирование'])[1 + i / 2 %% 4] END,
+                   CASE WHEN i %% 2 = 1 THEN 'Мотивационное письмо ' || i || '. ' || (ARRAY[
+                       'Хочу пройти стажировку и научиться промышленной разработке.',
+                       'Интересуюсь машинным обучением и обработкой данных.',
+                       'Участвовал в олимпиадах по программированию.',
+                       'Хочу применить знания алгоритмов на реальных задачах.'])[1 + i / 2 %% 4] END,
+                   CURRENT_TIMESTAMP - i * INTERVAL '5 minutes'
+            FROM generate_series(1, %s) AS i
+        ''', (applications,))
+
+        cur.execute('ALTER TABLE employees ENABLE TRIGGER USER')
+        cur.execute('ALTER TABLE tasks ENABLE TRIGGER USER')
+        cur.execute('SELECT rebuild_group_counters()')
+    conn.commit()
+
+    with conn.cursor() as cur:
+        for table in ('groups', 'employees', 'tasks', 'applications'):
+            cur.execute(f'ANALYZE {table}')
+    conn.commit()
+    return {'groups': groups, 'employees': employees, 'tasks': tasks, 'applications': applications}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--applications', type=int, default=10000)
+    args = parser.parse_args()
+
+    import psycopg2
+    conn = psycopg2.connect(require_database())
+    print(seed_database(conn, args.groups, args.employees, args.tasks, args.applications))
+
+
+if __name__ == '__main__':
+    main()
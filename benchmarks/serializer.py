@@ -0,0 +1,102 @@
+'''
+Time and peak Python memory of serializing the full tasks listing:
+fetchall + dict(zip()) + isoformat loop + json.dumps (the previous path)
+against a named cursor feeding serializer.ArrayWriter.
+
+    DATABASE_URL=postgresql://... python benchmarks/serializer.py --sizes 10000 100000
+
+Seeds the tasks table up to the largest size (counter triggers are
+suspended while seeding), use a disposable database.
+'''
+import argparse
+import json
+import time
+import tracemalloc
+
+from common import load_handler, require_database
+
+QUERY = '''
+    SELECT t.id, t.group_id, t.employee_id, t.title, t.description, t.status, t.priority,
+           t.due_date, t.created_at, t.completed_at, e.name as employee_name, g.name as group_name
+    FROM tasks t
+    LEFT JOIN employees e ON t.employee_id = e.id
+    LEFT JOIN groups g ON t.group_id = g.id
+    ORDER BY t.created_at DESC, t.id DESC
+    LIMIT %s
+'''
+
+
+def seed(conn, rows: int) -> None:
+    with conn.cursor() as cur:
+        cur.execute('SELECT COUNT(*) FROM tasks')
+        missing = rows - cur.fetchone()[0]
+        if missing > 0:
+            cur.execute('ALTER TABLE tasks DISABLE TRIGGER trg_tasks_group_counters')
+            cur.execute('''
+                INSERT INTO tasks (group_id, employee_id, title, description, status, priority, due_date, created_at)
+                SELECT 1, 1, 'Задача ' || i, 'Описание задачи ' || i, 'todo', 'medium',
+                       CURRENT_DATE + (i %% 30), CURRENT_TIMESTAMP - i * INTERVAL '1 second'
+                FROM generate_series(1, %s) AS i
+            ''', (missing,))
+            cur.execute('ALTER TABLE tasks ENABLE TRIGGER trg_tasks_group_counters')
+            cur.execute('SELECT rebuild_group_counters()')
+    conn.commit()
+
+
+def legacy(conn, rows: int) -> int:
+    with conn.cursor() as cur:
+        cur.execute(QUERY, (rows,))
+        columns = [desc[0] for desc in cur.description]
+        tasks = [dict(zip(columns, row)) for row in cur.fetchall()]
+    for task in tasks:
+        for field in ('created_at', 'completed_at', 'due_date'):
+            if task.get(field):
+                task[field] = task[field].isoformat()
+    return len(json.dumps({'tasks': tasks}))
+
+
+def streamed(conn, rows: int) -> int:
+    from serializer import ArrayWriter, open_cursor
+    cur = open_cursor(conn, QUERY, (rows,), server_side=True)
+    size = 0
+    try:
+        for chunk in ArrayWriter().write(cur):
+            size += len(chunk)
+    finally:
+        cur.close()
+    return size
+
+
+def measure(fn, conn, rows: int):
+    '''Wall time of an untraced run, then peak allocations of a traced one'''
+    started = time.perf_counter()
+    fn(conn, rows)
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    tracemalloc.start()
+    fn(conn, rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    conn.rollback()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    require_database()
+    load_handler('department')
+    from db import get_pool
+
+    with get_pool().connection() as conn:
+        seed(conn, max(args.sizes))
+        for rows in args.sizes:
+            for name, fn in (('legacy', legacy), ('streamed', streamed)):
+                elapsed, peak = measure(fn, conn, rows)
+                print(f'{rows:>8d} rows  {name:8s} {elapsed * 1000:9.1f} ms  peak {peak / 2 ** 20:8.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+'''
+Messages/sec of send-application-email against a local SMTP sink:
+a fresh connection per message (the old behavior), single requests over
+the reused session, and batch requests.
+
+    python benchmarks/smtp_send.py --messages 500 --latency-ms 5
+'''
+import argparse
+import json
+import os
+import smtplib
+import time
+
+from common import Context, load_handler, make_event
+from smtp_sink import start_sink
+
+
+def recipients(count: int):
+    return [
+        {'name': 'Иван', 'surname': f'Иванов{i}', 'email': f'bench{i}@example.com', 'application_type': 'applicant'}
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='delay the sink adds to every reply')
+    args = parser.parse_args()
+
+    sink = start_sink(latency=args.latency_ms / 1000)
+    os.environ.update({
+        'SMTP_HOST': '127.0.0.1',
+        'SMTP_PORT': str(sink.server_address[1]),
+        'SMTP_USER': 'bench@example.com',
+        'SMTP_PASSWORD': 'bench',
+        'SMTP_STARTTLS': 'false',
+    })
+    handler = load_handler('send-application-email')
+    import index
+    from models import ApplicationEmail
+
+    people = recipients(args.messages)
+
+    started = time.perf_counter()
+    for person in people:
+        message = index.render_message(ApplicationEmail(**person), 'bench@example.com')
+        with smtplib.SMTP('127.0.0.1', sink.server_address[1]) as server:
+            server.login('bench@example.com', 'bench')
+            server.sendmail('bench@example.com', [person['email']], message)
+    fresh = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for person in people:
+        response = handler(make_event('POST', body=person), Context('send-application-email'))
+        assert response['statusCode'] == 200, response['body']
+    reused = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for offset in range(0, len(people), args.batch):
+        response = handler(make_event('POST', body=people[offset:offset + args.batch]), Context('send-application-email'))
+        assert json.loads(response['body'])['success'], response['body']
+    batched = time.perf_counter() - started
+
+    print(f'connection per message {args.messages / fresh:8.0f} msg/s')
+    print(f'reused session         {args.messages / reused:8.0f} msg/s')
+    print(f'batch of {args.batch:<4d}          {args.messages / batched:8.0f} msg/s')
+    print(f'sink connections: {sink.connections}, messages: {sink.messages}')
+
+
+if __name__ == '__main__':
+    main()
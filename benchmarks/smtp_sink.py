@@ -0,0 +1,80 @@
+'''
+Minimal threaded SMTP sink for local runs: accepts AUTH PLAIN, swallows
+every message and counts it. No STARTTLS, so point the functions at it
+with SMTP_STARTTLS=false.
+
+    python benchmarks/smtp_sink.py --port 2525 --latency-ms 20
+'''
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency: float = 0.0):
+        super().__init__(address, SMTPHandler)
+        self.latency = latency
+        self.messages = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self) -> None:
+        self.server.count('connections')
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-sink')
+                self.reply('250 AUTH PLAIN')
+            elif command.startswith('AUTH'):
+                self.reply('235 authenticated')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                self.server.count('messages')
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+def start_sink(port: int = 0, latency: float = 0.0) -> SMTPSink:
+    '''Run a sink in a background thread, port 0 picks a free one'''
+    sink = SMTPSink(('127.0.0.1', port), latency)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    sink = SMTPSink(('127.0.0.1', args.port), args.latency_ms / 1000)
+    print(f'SMTP sink on 127.0.0.1:{args.port}')
+    sink.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+-- Ключ пагинации задач (created_at, id) не допускает NULL
+UPDATE tasks SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE tasks ALTER COLUMN created_at SET NOT NULL;
+
+-- Индексы для постраничной выборки по ключу (keyset pagination)
+CREATE INDEX IF NOT EXISTS idx_employees_group_id_id ON employees(group_id, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at_id ON tasks(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_group_id_created_at_id ON tasks(group_id, created_at, id);
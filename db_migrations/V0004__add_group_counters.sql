@@ -0,0 +1,118 @@
+-- Счётчики сотрудников и задач по группам, поддерживаются триггерами
+ALTER TABLE groups
+    ADD COLUMN IF NOT EXISTS employee_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS task_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS todo_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS in_progress_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS completed_count INTEGER NOT NULL DEFAULT 0;
+
+-- Изменение счётчиков задач группы на delta для указанного статуса
+CREATE OR REPLACE FUNCTION adjust_group_task_counters(p_group_id INTEGER, p_status VARCHAR, delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_group_id IS NULL THEN
+        RETURN;
+    END IF;
+    UPDATE groups SET
+        task_count = task_count + delta,
+        todo_count = todo_count + CASE WHEN p_status = 'todo' THEN delta ELSE 0 END,
+        in_progress_count = in_progress_count + CASE WHEN p_status = 'in_progress' THEN delta ELSE 0 END,
+        completed_count = completed_count + CASE WHEN p_status = 'completed' THEN delta ELSE 0 END
+    WHERE id = p_group_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION employees_group_counters() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.group_id IS NOT NULL THEN
+        UPDATE groups SET employee_count = employee_count - 1 WHERE id = OLD.group_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.group_id IS NOT NULL THEN
+        UPDATE groups SET employee_count = employee_count + 1 WHERE id = NEW.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tasks_group_counters() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM adjust_group_task_counters(OLD.group_id, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM adjust_group_task_counters(NEW.group_id, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_employees_group_counters ON employees;
+CREATE TRIGGER trg_employees_group_counters
+    AFTER INSERT OR DELETE ON employees
+    FOR EACH ROW EXECUTE FUNCTION employees_group_counters();
+
+DROP TRIGGER IF EXISTS trg_employees_group_counters_move ON employees;
+CREATE TRIGGER trg_employees_group_counters_move
+    AFTER UPDATE OF group_id ON employees
+    FOR EACH ROW WHEN (OLD.group_id IS DISTINCT FROM NEW.group_id)
+    EXECUTE FUNCTION employees_group_counters();
+
+DROP TRIGGER IF EXISTS trg_tasks_group_counters ON tasks;
+CREATE TRIGGER trg_tasks_group_counters
+    AFTER INSERT OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION tasks_group_counters();
+
+DROP TRIGGER IF EXISTS trg_tasks_group_counters_change ON tasks;
+CREATE TRIGGER trg_tasks_group_counters_change
+    AFTER UPDATE OF group_id, status ON tasks
+    FOR EACH ROW WHEN (OLD.group_id IS DISTINCT FROM NEW.group_id OR OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION tasks_group_counters();
+
+-- Пересчёт счётчиков с нуля, возвращает число исправленных групп
+CREATE OR REPLACE FUNCTION rebuild_group_counters() RETURNS INTEGER AS $$
+DECLARE
+    fixed INTEGER;
+BEGIN
+    -- Блокируем запись на время пересчёта, чтобы триггеры не разошлись с итогом
+    LOCK TABLE employees, tasks IN SHARE MODE;
+    WITH employee_totals AS (
+        SELECT group_id, COUNT(*) AS employee_count
+        FROM employees
+        WHERE group_id IS NOT NULL
+        GROUP BY group_id
+    ), task_totals AS (
+        SELECT group_id,
+               COUNT(*) AS task_count,
+               COUNT(*) FILTER (WHERE status = 'todo') AS todo_count,
+               COUNT(*) FILTER (WHERE status = 'in_progress') AS in_progress_count,
+               COUNT(*) FILTER (WHERE status = 'completed') AS completed_count
+        FROM tasks
+        WHERE group_id IS NOT NULL
+        GROUP BY group_id
+    ), actual AS (
+        SELECT g.id,
+               COALESCE(et.employee_count, 0) AS employee_count,
+               COALESCE(tt.task_count, 0) AS task_count,
+               COALESCE(tt.todo_count, 0) AS todo_count,
+               COALESCE(tt.in_progress_count, 0) AS in_progress_count,
+               COALESCE(tt.completed_count, 0) AS completed_count
+        FROM groups g
+        LEFT JOIN employee_totals et ON et.group_id = g.id
+        LEFT JOIN task_totals tt ON tt.group_id = g.id
+    )
+    UPDATE groups g SET
+        employee_count = a.employee_count,
+        task_count = a.task_count,
+        todo_count = a.todo_count,
+        in_progress_count = a.in_progress_count,
+        completed_count = a.completed_count
+    FROM actual a
+    WHERE g.id = a.id
+      AND (g.employee_count, g.task_count, g.todo_count, g.in_progress_count, g.completed_count)
+          IS DISTINCT FROM (a.employee_count, a.task_count, a.todo_count, a.in_progress_count, a.completed_count);
+    GET DIAGNOSTICS fixed = ROW_COUNT;
+    RETURN fixed;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_group_counters();
@@ -0,0 +1,5 @@
+-- Версии данных для ETag-кэша списков отдела, увеличиваются при каждой записи
+CREATE TABLE IF NOT EXISTS cache_versions (
+    scope VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
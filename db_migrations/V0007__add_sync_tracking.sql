@@ -0,0 +1,93 @@
+-- Время последнего изменения строк для дельта-синхронизации
+ALTER TABLE employees ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+UPDATE employees SET updated_at = created_at WHERE updated_at IS NULL;
+UPDATE employees SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;
+UPDATE tasks SET updated_at = GREATEST(created_at, completed_at) WHERE updated_at IS NULL;
+
+ALTER TABLE employees
+    ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN updated_at SET NOT NULL;
+ALTER TABLE tasks
+    ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN updated_at SET NOT NULL;
+
+-- Индексы для выборки изменений по ключу (updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_employees_updated_at_id ON employees(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_employees_group_id_updated_at_id ON employees(group_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at_id ON tasks(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_group_id_updated_at_id ON tasks(group_id, updated_at, id);
+
+-- Надгробия удалённых строк и строк, перемещённых в другую группу
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    resource VARCHAR(20) NOT NULL,
+    row_id INTEGER NOT NULL,
+    group_id INTEGER,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_resource_deleted_at ON sync_tombstones(resource, deleted_at);
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_deleted_at ON sync_tombstones(deleted_at);
+
+-- updated_at всегда равен времени начала изменившей строку транзакции
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Надгробие пишется при удалении и при смене группы (для клиентов, синхронизирующих одну группу).
+-- Надгробия старше 30 дней удаляются, клиентам с более старым токеном нужна полная синхронизация
+CREATE OR REPLACE FUNCTION record_sync_tombstone() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_tombstones (resource, row_id, group_id)
+    VALUES (TG_TABLE_NAME, OLD.id, OLD.group_id);
+    DELETE FROM sync_tombstones WHERE deleted_at < CURRENT_TIMESTAMP - INTERVAL '30 days';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_employees_touch_updated_at ON employees;
+CREATE TRIGGER trg_employees_touch_updated_at
+    BEFORE INSERT OR UPDATE ON employees
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_tasks_touch_updated_at ON tasks;
+CREATE TRIGGER trg_tasks_touch_updated_at
+    BEFORE INSERT OR UPDATE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_employees_sync_tombstone ON employees;
+CREATE TRIGGER trg_employees_sync_tombstone
+    AFTER DELETE ON employees
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+DROP TRIGGER IF EXISTS trg_employees_sync_tombstone_move ON employees;
+CREATE TRIGGER trg_employees_sync_tombstone_move
+    AFTER UPDATE OF group_id ON employees
+    FOR EACH ROW WHEN (OLD.group_id IS DISTINCT FROM NEW.group_id)
+    EXECUTE FUNCTION record_sync_tombstone();
+
+DROP TRIGGER IF EXISTS trg_tasks_sync_tombstone ON tasks;
+CREATE TRIGGER trg_tasks_sync_tombstone
+    AFTER DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
+DROP TRIGGER IF EXISTS trg_tasks_sync_tombstone_move ON tasks;
+CREATE TRIGGER trg_tasks_sync_tombstone_move
+    AFTER UPDATE OF group_id ON tasks
+    FOR EACH ROW WHEN (OLD.group_id IS DISTINCT FROM NEW.group_id)
+    EXECUTE FUNCTION record_sync_tombstone();
+
+-- Нижняя граница updated_at для ещё не зафиксированных транзакций: строки, изменённые
+-- открытыми сейчас транзакциями, не могут получить updated_at меньше этого значения
+CREATE OR REPLACE FUNCTION sync_watermark() RETURNS TIMESTAMP AS $$
+    SELECT LEAST(
+        CURRENT_TIMESTAMP,
+        (SELECT min(xact_start) FROM pg_stat_activity
+         WHERE datname = current_database() AND pid <> pg_backend_pid())
+    )::TIMESTAMP;
+$$ LANGUAGE sql;
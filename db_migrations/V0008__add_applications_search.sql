@@ -0,0 +1,11 @@
+-- Взвешенный поисковый вектор по анкетам: должность и специальность важнее вуза, письма ниже всего
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(position, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(specialty, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(university, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(cover_letter, '')), 'C') ||
+        setweight(to_tsvector('russian', coalesce(motivation_letter, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_applications_search_vector ON applications USING GIN (search_vector);
@@ -0,0 +1,3 @@
+-- Индексы для статистики задач по группе и по сотруднику
+CREATE INDEX IF NOT EXISTS idx_tasks_group_id_status ON tasks(group_id, status);
+CREATE INDEX IF NOT EXISTS idx_tasks_employee_id_status ON tasks(employee_id, status);
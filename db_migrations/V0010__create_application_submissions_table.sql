@@ -0,0 +1,10 @@
+-- Ключи идемпотентности отправки анкет: заголовок Idempotency-Key клиента или хеш содержимого анкеты
+CREATE TABLE IF NOT EXISTS application_submissions (
+    idempotency_key VARCHAR(80) PRIMARY KEY,
+    request_hash CHAR(64) NOT NULL,
+    application_id INTEGER REFERENCES applications(id) ON DELETE CASCADE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Очистка ключей с истёкшим окном
+CREATE INDEX IF NOT EXISTS idx_application_submissions_created_at ON application_submissions(created_at);
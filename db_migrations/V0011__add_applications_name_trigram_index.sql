@@ -0,0 +1,11 @@
+-- Нечёткий поиск по имени и фамилии (триграммы). pg_trgm есть не на каждом сервере:
+-- без него миграция ничего не делает, а поиск по ?name= отвечает 501
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_applications_full_name_trgm
+            ON applications USING GIN ((name || ' ' || surname) gin_trgm_ops);
+    END IF;
+END;
+$$;
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
@@ -73,6 +73,7 @@ const jobs: Job[] = [
 const Careers = () => {
   const [selectedDepartment, setSelectedDepartment] = useState<string>('Все');
   const [isSubmitting, setIsSubmitting] = useState(false);
+  const pendingSubmission = useRef<{ body: string; key: string } | null>(null);
   const { toast } = useToast();
 
   const departments = ['Все', ...Array.from(new Set(jobs.map(job => job.department)))];
@@ -109,25 +110,43 @@ const Careers = () => {
       payload.portfolio_url = formData.get('portfolio_url') as string || null;
     }
 
+    // Resending the same form after a timeout or 429 reuses its key, so the server answers with the original application
+    const body = JSON.stringify(payload);
+    if (pendingSubmission.current?.body !== body) {
+      pendingSubmission.current = { body, key: crypto.randomUUID() };
+    }
+
     try {
       const response = await fetch('https://functions.poehali.dev/31db2cf7-bec4-48ca-8654-db4fcedb4ab7', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': pendingSubmission.current.key,
         },
-        body: JSON.stringify(payload)
+        body
       });
 
       const result = await response.json();
 
+      if (response.status !== 429) {
+        pendingSubmission.current = null;
+      }
+
       if (response.ok) {
         toast({
           title: 'Анкета отправлена',
-          description: result.email_sent 
-            ? `Анкета сохранена! Письмо отправлено на ${payload.email}`
+          description: result.email_queued
+            ? `Анкета сохранена! Письмо с подтверждением придёт на ${payload.email}`
             : 'Анкета сохранена! Мы свяжемся с вами в ближайшее время.',
         });
         (e.target as HTMLFormElement).reset();
+      } else if (response.status === 429) {
+        const retryAfter = response.headers.get('Retry-After') || '1';
+        toast({
+          title: 'Слишком много заявок',
+          description: `Сервер перегружен, повторите отправку через ${retryAfter} с.`,
+          variant: 'destructive'
+        });
       } else {
         toast({
           title: 'Ошибка',
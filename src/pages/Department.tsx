@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
@@ -44,6 +44,52 @@ interface Task {
   group_name?: string;
 }
 
+interface SyncResult<T> {
+  items: T[];
+  deleted: number[];
+  since: string;
+  full: boolean;
+}
+
+// Throws on any failed page, so the caller keeps its previous tokens; an expired token restarts the sync once
+const syncChanges = async <T,>(resource: string, since: string, restarted = false): Promise<SyncResult<T>> => {
+  const items: T[] = [];
+  const deleted: number[] = [];
+  let token = since;
+  let hasMore = true;
+  while (hasMore) {
+    const response = await fetch(`${API_URL}?resource=${resource}&since=${encodeURIComponent(token)}`);
+    if (response.status === 410 && !restarted) {
+      return syncChanges<T>(resource, '', true);
+    }
+    if (!response.ok) {
+      throw new Error(`Sync of ${resource} failed with ${response.status}`);
+    }
+    const data = await response.json();
+    items.push(...(data[resource] || []));
+    deleted.push(...(data.deleted || []));
+    token = data.next_since;
+    hasMore = data.has_more;
+  }
+  return { items, deleted, since: token, full: since === '' };
+};
+
+const applyChanges = <T extends { id: number },>(
+  current: T[],
+  result: SyncResult<T>,
+  compare: (a: T, b: T) => number
+): T[] => {
+  const byId = new Map(result.full ? [] : current.map((item) => [item.id, item]));
+  result.deleted.forEach((id) => byId.delete(id));
+  result.items.forEach((item) => byId.set(item.id, item));
+  return Array.from(byId.values()).sort(compare);
+};
+
+const byGroupThenId = (a: Employee, b: Employee) =>
+  (a.group_id ?? Infinity) - (b.group_id ?? Infinity) || a.id - b.id;
+
+const newestFirst = (a: Task, b: Task) => b.id - a.id;
+
 const Department = () => {
   const [groups, setGroups] = useState<Group[]>([]);
   const [employees, setEmployees] = useState<Employee[]>([]);
@@ -52,27 +98,27 @@ const Department = () => {
   const [loading, setLoading] = useState(true);
   const [addEmployeeOpen, setAddEmployeeOpen] = useState(false);
   const [addTaskOpen, setAddTaskOpen] = useState(false);
+  const syncTokens = useRef({ employees: '', tasks: '' });
   const { toast } = useToast();
 
   useEffect(() => {
     fetchData();
   }, []);
 
-  const fetchData = async () => {
+  const fetchData = async (afterWrite = false) => {
     try {
-      const [groupsRes, employeesRes, tasksRes] = await Promise.all([
-        fetch(`${API_URL}?resource=groups`),
-        fetch(`${API_URL}?resource=employees`),
-        fetch(`${API_URL}?resource=tasks`)
+      const [groupsRes, employeeChanges, taskChanges] = await Promise.all([
+        fetch(`${API_URL}?resource=groups`, afterWrite ? { headers: { 'X-Read-Your-Writes': '1' } } : undefined),
+        syncChanges<Employee>('employees', syncTokens.current.employees),
+        syncChanges<Task>('tasks', syncTokens.current.tasks)
       ]);
 
       const groupsData = await groupsRes.json();
-      const employeesData = await employeesRes.json();
-      const tasksData = await tasksRes.json();
+      syncTokens.current = { employees: employeeChanges.since, tasks: taskChanges.since };
 
       setGroups(groupsData.groups || []);
-      setEmployees(employeesData.employees || []);
-      setTasks(tasksData.tasks || []);
+      setEmployees((current) => applyChanges(current, employeeChanges, byGroupThenId));
+      setTasks((current) => applyChanges(current, taskChanges, newestFirst));
     } catch (error) {
       toast({
         title: 'Ошибка',
@@ -105,7 +151,7 @@ const Department = () => {
       if (response.ok) {
         toast({ title: 'Успешно', description: 'Сотрудник добавлен' });
         setAddEmployeeOpen(false);
-        fetchData();
+        fetchData(true);
         (e.target as HTMLFormElement).reset();
       }
     } catch (error) {
@@ -134,7 +180,7 @@ const Department = () => {
       if (response.ok) {
         toast({ title: 'Успешно', description: 'Задача создана' });
         setAddTaskOpen(false);
-        fetchData();
+        fetchData(true);
         (e.target as HTMLFormElement).reset();
       }
     } catch (error) {
@@ -152,7 +198,7 @@ const Department = () => {
 
       if (response.ok) {
         toast({ title: 'Успешно', description: 'Статус задачи обновлён' });
-        fetchData();
+        fetchData(true);
       }
     } catch (error) {
       toast({ title: 'Ошибка', description: 'Не удалось обновить статус', variant: 'destructive' });